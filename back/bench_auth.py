@@ -0,0 +1,99 @@
+"""
+Benchmark de autenticación (services/security.py), sin Mongo.
+
+Mide:
+- el coste por petición de get_current_user_email: token firmado verificado
+  en frío, desde la caché de tokens verificados, y el token fake anterior
+  (solo un replace de texto) como referencia;
+- el throughput de login (verificación scrypt) con N logins en paralelo,
+  calculando el hash en el event loop (como si no hubiera pool) y en el pool
+  de hilos, junto con el mayor retraso que sufre el event loop mientras tanto.
+
+Uso:
+    python bench_auth.py --tokens 20000 --logins 64
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("AUTH_SECRET_KEY", "bench-secret-solo-para-medir-el-rendimiento")
+
+from dependencies import get_current_user_email
+from services.security import (
+    create_access_token, hash_password, token_verifier,
+    verify_password, verify_password_async, AUTH_HASH_WORKERS
+)
+
+
+async def per_request(tokens: int):
+    headers = [f"Bearer {create_access_token(f'user{i}@bench.dev')}" for i in range(tokens)]
+
+    async def run(label, values):
+        started = time.perf_counter()
+        for value in values:
+            await get_current_user_email(value)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<34} {elapsed / len(values) * 1e6:8.2f} µs/petición")
+
+    token_verifier.max_entries = max(token_verifier.max_entries, tokens)
+    await run("token firmado (frío)", headers)
+    await run("token firmado (caché)", headers)
+
+    # Referencia: el parseo del token fake que había antes, sin verificación alguna
+    legacy = [f"user{i}@bench.dev-fake-jwt-token" for i in range(tokens)]
+    started = time.perf_counter()
+    for token in legacy:
+        token.replace("-fake-jwt-token", "")
+    print(f"{'token fake anterior (sin firma)':<34} {(time.perf_counter() - started) / tokens * 1e6:8.2f} µs/petición")
+    print(f"verificaciones: {token_verifier.stats()}\n")
+
+
+async def loop_lag_during(work):
+    """Ejecuta work() y devuelve (segundos, mayor bloqueo del event loop en ms)."""
+    worst = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal worst
+        while running:
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            worst = max(worst, time.perf_counter() - before - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    running = False
+    await tick
+    return elapsed, worst * 1000
+
+
+async def logins(count: int):
+    stored = hash_password("correcta-horse-battery")
+
+    async def inline():
+        for _ in range(count):
+            verify_password("correcta-horse-battery", stored)
+            await asyncio.sleep(0)
+
+    async def pooled():
+        await asyncio.gather(*(verify_password_async("correcta-horse-battery", stored) for _ in range(count)))
+
+    for label, work in (("en el event loop", inline), (f"pool de {AUTH_HASH_WORKERS} hilos", pooled)):
+        elapsed, lag = await loop_lag_during(work)
+        print(f"login {label:<22} {count / elapsed:8.1f} logins/s   bloqueo máx. del loop {lag:8.1f} ms")
+
+
+async def main(tokens: int, login_count: int):
+    await per_request(tokens)
+    await logins(login_count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.logins))
@@ -0,0 +1,77 @@
+"""
+Benchmark de concurrencia de la API contra un MongoDB real.
+
+Levanta la app en el mismo proceso (con su lifespan), siembra un usuario en una
+base de datos aparte y lanza el mismo número de peticiones a /dashboard con
+distintos niveles de peticiones en vuelo. Con el acceso a Mongo asíncrono el
+throughput debe crecer con la concurrencia en lugar de quedarse plano.
+
+Uso:
+    python bench_concurrency.py --requests 2000 --levels 1,4,16,64
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Base de datos separada para no tocar los datos de desarrollo
+os.environ.setdefault("DB_NAME", "nutrismart_bench")
+
+import httpx
+
+from main import app
+from config.database import get_db
+from services.security import create_access_token
+
+BENCH_EMAIL = "bench.user@nutrismart.dev"
+AUTH_HEADERS = {"Authorization": f"Bearer {create_access_token(BENCH_EMAIL)}"}
+
+
+async def seed(db):
+    await db.profiles.update_one(
+        {"user_email": BENCH_EMAIL},
+        {"$set": {
+            "user_email": BENCH_EMAIL, "goal": "Perder peso", "weight": 70, "height": 170,
+            "age": 30, "sex": "Femenino", "activityLevel": "Moderado", "allergies": [],
+            "caloriesTarget": 1800, "macros": {"protein": 140, "carbs": 180, "fat": 60},
+        }},
+        upsert=True,
+    )
+
+
+async def run_level(client: httpx.AsyncClient, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            resp = await client.get("/api/v1/dashboard/", headers=AUTH_HEADERS)
+            resp.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start
+
+
+async def main(total: int, levels):
+    async with app.router.lifespan_context(app):
+        await seed(get_db())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Calentamiento (conexiones del pool, imports perezosos)
+            await run_level(client, 50, 10)
+
+            baseline = None
+            print(f"{'en vuelo':>9} {'segundos':>9} {'req/s':>9} {'speedup':>8}")
+            for level in levels:
+                elapsed = await run_level(client, total, level)
+                rps = total / elapsed
+                baseline = baseline or rps
+                print(f"{level:>9} {elapsed:>9.2f} {rps:>9.0f} {rps / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, [int(x) for x in args.levels.split(",")]))
@@ -0,0 +1,76 @@
+"""
+Benchmark del índice de búsqueda en memoria de /food/search.
+
+Genera un catálogo sintético (por defecto 500k alimentos) combinando los nombres
+de seed_db.py con variantes, lo indexa y mide la latencia por consulta para
+distintos tipos de búsqueda (1 letra, prefijo, palabra completa, infijo, varias
+palabras y combinaciones que no coinciden con nada). No necesita MongoDB.
+
+Uso:
+    python bench_food_search.py --size 500000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from services.food_search import FoodSearchIndex
+
+BASE_NAMES = [
+    "Pechuga de Pollo", "Huevo Cocido", "Atún en agua", "Carne de Res Magra", "Salmón",
+    "Tofu", "Yogur Griego", "Batido Whey Protein", "Lentejas cocidas", "Garbanzos",
+    "Arroz Integral", "Avena cocida", "Camote cocido", "Papa cocida", "Quinoa cocida",
+    "Pan Integral", "Pasta Integral", "Tortilla de maíz", "Plátano", "Manzana", "Naranja",
+    "Espinaca", "Brócoli", "Zanahoria", "Palta / Aguacate", "Almendras",
+    "Mantequilla de Maní", "Aceite de Oliva", "Chocolate Negro 70%",
+]
+STYLES = ["", "al horno", "a la plancha", "con limón", "light", "orgánico", "casero", "en ensalada"]
+PORTIONS = ["(100g)", "(1 taza)", "(1 ud)", "(30g)", "(1 porción)", "(Media)"]
+
+QUERIES = {
+    "1 letra": ["p", "a", "m"],
+    "prefijo": ["pla", "arr", "pech"],
+    "palabra": ["platano", "pollo", "integral"],
+    "infijo": ["tegral", "ocid", "nzana"],
+    "varias palabras": ["pan int", "pollo plancha", "arroz casero"],
+    # Sin resultados: obligan a descartar todos los candidatos
+    "sin resultados": ["pollo zanahoria", "cocido plancha limon", "salmon 70 light"],
+}
+
+
+def build_catalog(size: int):
+    rng = random.Random(42)
+    for food_id in range(1, size + 1):
+        name = " ".join(filter(None, [rng.choice(BASE_NAMES), rng.choice(STYLES), f"#{food_id}", rng.choice(PORTIONS)]))
+        yield {"id": food_id, "name": name, "detail": "1 porción • 100 Kcal"}
+
+
+def main(size: int, repeat: int):
+    index = FoodSearchIndex()
+    start = time.perf_counter()
+    index.add_many(build_catalog(size))
+    print(f"Indexados {len(index)} alimentos en {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'tipo':<16} {'consulta':<22} {'página':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for kind, queries in QUERIES.items():
+        for query in queries:
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                results, _ = index.search(query, limit=50)
+                timings.append((time.perf_counter() - t0) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{kind:<16} {query:<22} {len(results):>7} {statistics.median(timings):>8.3f} {p95:>8.3f}")
+
+    t0 = time.perf_counter()
+    index.add({"id": size + 1, "name": "Plátano frito (1 porción)", "detail": ""})
+    print(f"\nAlta incremental de un alimento: {(time.perf_counter() - t0) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.size, args.repeat)
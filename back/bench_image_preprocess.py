@@ -0,0 +1,131 @@
+"""
+Benchmark del pre-procesado de imágenes de visión, con un modelo simulado.
+
+Genera fotos sintéticas del tamaño de una foto de móvil (12 MP, JPEG de varios
+MB, algunas con orientación EXIF) y pasa cada una por analyze_image_nutrition
+dos veces: sin pre-procesado (la imagen completa, como antes) y con él.
+El modelo es un stub que:
+- mide los bytes que recibiría Gemini,
+- simula la subida con un ancho de banda configurable,
+- "reconoce" el alimento por el color medio, para comprobar que el resultado
+  no cambia al reducir la imagen.
+No necesita red ni API key.
+
+Uso:
+    python bench_image_preprocess.py --images 6 --upload-mbps 20
+"""
+import argparse
+import io
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "bench-sin-red")
+
+from PIL import Image
+
+from services import gemini_service
+
+PALETTE = {
+    "Manzana": (200, 30, 40),
+    "Plátano": (230, 200, 60),
+    "Brócoli": (40, 140, 50),
+    "Arroz Integral": (190, 160, 120),
+    "Salmón": (240, 130, 100),
+    "Arándanos": (60, 50, 140),
+}
+
+
+class StubModel:
+    def __init__(self, upload_mbps: float):
+        self.upload_mbps = upload_mbps
+        self.last_payload_bytes = 0
+
+    def generate_content(self, prompt_parts):
+        image = prompt_parts[-1]
+        if isinstance(image, dict):
+            payload = image["data"]
+            decoded = Image.open(io.BytesIO(payload))
+        else:
+            # El SDK re-codifica las imágenes PIL a JPEG antes de subirlas
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG")
+            payload = buffer.getvalue()
+            decoded = image
+
+        self.last_payload_bytes = len(payload)
+        time.sleep(len(payload) * 8 / (self.upload_mbps * 1_000_000))
+
+        name = classify(decoded)
+        kcal = 50 + 10 * list(PALETTE).index(name)
+        return SimpleNamespace(text=json.dumps({"name": name, "calories": kcal, "protein": 2, "fat": 1}))
+
+
+def classify(image: Image.Image) -> str:
+    r, g, b = image.convert("RGB").resize((1, 1), Image.BOX).getpixel((0, 0))
+    return min(PALETTE, key=lambda n: sum((c - p) ** 2 for c, p in zip((r, g, b), _as_photographed(PALETTE[n]))))
+
+
+def _as_photographed(color):
+    # Las fotos sintéticas mezclan el color base con ruido gris (ver make_photo)
+    return tuple(int(c * 0.7 + 128 * 0.3) for c in color)
+
+
+def make_photo(name: str, size, orientation: int) -> bytes:
+    base = Image.new("RGB", size, PALETTE[name])
+    noise = Image.effect_noise(size, 64).convert("RGB")
+    photo = Image.blend(base, noise, 0.3)
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    output = io.BytesIO()
+    photo.save(output, format="JPEG", quality=95, exif=exif.tobytes())
+    return output.getvalue()
+
+
+def run(image_bytes: bytes, stub: StubModel, preprocess: bool):
+    gemini_service.VISION_PREPROCESS = preprocess
+    started = time.perf_counter()
+    result = gemini_service.analyze_image_nutrition(image_bytes)
+    return result, stub.last_payload_bytes, time.perf_counter() - started
+
+
+def main(images: int, upload_mbps: float):
+    stub = StubModel(upload_mbps)
+    gemini_service.model = stub
+    rng = random.Random(7)
+
+    rows = []
+    for i in range(images):
+        name = rng.choice(list(PALETTE))
+        orientation = rng.choice([1, 6, 8])
+        photo = make_photo(name, (4032, 3024), orientation)
+        before = run(photo, stub, preprocess=False)
+        after = run(photo, stub, preprocess=True)
+        rows.append((name, len(photo), before, after))
+
+    print(f"Subida simulada a {upload_mbps} Mbps\n")
+    print(f"{'foto':<16} {'original':>10} {'antes':>10} {'después':>10} {'t antes':>8} {'t desp.':>8}  reconocido")
+    totals = [0, 0, 0, 0.0, 0.0]
+    same = 0
+    for name, original, (res_b, sent_b, t_b), (res_a, sent_a, t_a) in rows:
+        match = res_b.get("name") == res_a.get("name") == name
+        same += match
+        print(f"{name:<16} {original / 1e6:>8.2f}MB {sent_b / 1e6:>8.2f}MB {sent_a / 1e6:>8.2f}MB "
+              f"{t_b:>7.2f}s {t_a:>7.2f}s  {res_b.get('name')} / {res_a.get('name')}{'' if match else '  <-- distinto'}")
+        for idx, value in enumerate((original, sent_b, sent_a, t_b, t_a)):
+            totals[idx] += value
+
+    print(f"\nBytes enviados: {totals[1] / 1e6:.1f} MB -> {totals[2] / 1e6:.1f} MB "
+          f"({100 * totals[2] / totals[1]:.1f}% del original)")
+    print(f"Latencia total: {totals[3]:.2f}s -> {totals[4]:.2f}s")
+    print(f"Reconocimiento igual en {same}/{len(rows)} fotos")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=6)
+    parser.add_argument("--upload-mbps", type=float, default=20.0)
+    args = parser.parse_args()
+    main(args.images, args.upload_mbps)
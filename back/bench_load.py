@@ -0,0 +1,323 @@
+"""
+Prueba de carga reproducible de la API con tráfico mixto.
+
+Levanta la app en el mismo proceso (con su lifespan) contra un MongoDB local,
+en una base de datos aparte que se vacía y se siembra al empezar:
+- --users usuarios con perfil y --days días de historial cada uno,
+- un catálogo de --foods alimentos (variantes de los del seed),
+- el backend de visión simulado (VISION_BACKEND=stub), sin red ni API key.
+
+Después lanza --requests peticiones con --concurrency clientes en paralelo
+(bucle cerrado: cada cliente espera su respuesta antes de enviar la
+siguiente). Cada petición es un escenario elegido al azar según --mix:
+
+    dashboard  GET  /dashboard/
+    search     GET  /food/search?q=<prefijo de un alimento del catálogo>
+    log        POST /food/log
+    history    GET  /history/days
+    analyze    POST /vision/analyze-food (una de --images fotos sintéticas)
+
+El resultado es un JSON con la latencia p50/p95/p99 y el throughput de cada
+escenario y del total, junto con el commit y los parámetros, para poder
+comparar entre versiones. Con --compare se muestra la diferencia con un JSON
+anterior. La misma --seed genera el mismo dataset y la misma secuencia de
+peticiones: el escenario, el usuario y los parámetros de cada una se deciden
+antes de empezar, no según el orden en que llegan las respuestas.
+
+Uso:
+    python bench_load.py --users 200 --foods 5000 --requests 5000 --concurrency 32 --output load.json
+    python bench_load.py --compare load.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+DEFAULT_MIX = "dashboard=30,search=25,log=15,history=20,analyze=10"
+
+
+async def seed(db, rng: random.Random, users: int, foods: int, days: int):
+    # Imports perezosos: dependen de las variables de entorno que fija main()
+    from seed_db import food_data
+    from services.food_search import normalize_text
+    from services.daily_log import rollup_rebuild_pipeline
+    from services.security import hash_password
+    from config.indexes import INDEXES
+
+    for name in await db.list_collection_names():
+        await db.drop_collection(name)
+
+    catalog = []
+    for i in range(foods):
+        base = food_data[i % len(food_data)]
+        variant = i // len(food_data)
+        name = base["name"] if variant == 0 else f"{base['name']} v{variant}"
+        catalog.append({**base, "id": i + 1, "name": name, "name_key": normalize_text(name)})
+    await db.foods.insert_many(catalog)
+    await db.counters.insert_one({"_id": "foods", "seq": foods})
+
+    # scrypt es lento a propósito: todos los usuarios comparten el mismo hash
+    password = hash_password("bench-password")
+    emails = [f"user{i}@bench.dev" for i in range(users)]
+    await db.users.insert_many([
+        {"email": email, "name": f"Bench {i}", "password": password, "created_at": datetime.now()}
+        for i, email in enumerate(emails)
+    ])
+    profiles, records = [], []
+    today = date.today()
+    for email in emails:
+        target = rng.choice((1600, 1800, 2200, 2800))
+        profiles.append({
+            "user_email": email, "goal": rng.choice(("Perder peso", "Mantener peso", "Ganar músculo")),
+            "weight": 70, "height": 170, "age": 30, "sex": "Femenino", "activityLevel": "Moderado",
+            "allergies": rng.choice(([], [], ["Lactosa"], ["Frutos secos"])), "caloriesTarget": target,
+            "macros": {"protein": target * 3 // 40, "carbs": target * 45 // 400, "fat": target // 36},
+        })
+        for offset in range(1, days + 1):
+            calories = int(target * rng.uniform(0.7, 1.2))
+            records.append({
+                "user_email": email, "date": (today - timedelta(days=offset)).isoformat(),
+                "calories": calories, "protein": round(calories * 0.3 / 4, 1), "carbs": round(calories * 0.45 / 4, 1),
+                "fat": round(calories * 0.25 / 9, 1), "target": target,
+                "status": "success" if calories <= target else "warning",
+            })
+    await db.profiles.insert_many(profiles)
+    if records:
+        await db.daily_records.insert_many(records)
+        # $merge necesita el índice único de history_rollups
+        await db.history_rollups.create_indexes(INDEXES["history_rollups"])
+        for period in ("week", "month"):
+            await db.daily_records.aggregate(rollup_rebuild_pipeline(period)).to_list(None)
+    return emails, [food["name"] for food in catalog]
+
+
+def synthetic_images(rng: random.Random, count: int):
+    """Fotos JPEG pequeñas de colores distintos; se repiten, así que también se ejercita la caché."""
+    from PIL import Image
+
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new("RGB", (640, 480), color).save(buffer, format="JPEG", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+
+class Scenarios:
+    def __init__(self, rng: random.Random, emails, food_names, images):
+        from services.security import create_access_token
+
+        self.rng = rng
+        self.headers = [{"Authorization": f"Bearer {create_access_token(email)}"} for email in emails]
+        self.food_names = food_names
+        self.images = images
+
+    async def dashboard(self, client, headers, rng):
+        return await client.get("/api/v1/dashboard/", headers=headers)
+
+    async def search(self, client, headers, rng):
+        name = rng.choice(self.food_names)
+        query = name[:rng.randint(3, max(3, min(len(name), 12)))]
+        return await client.get("/api/v1/food/search", params={"q": query}, headers=headers)
+
+    async def log(self, client, headers, rng):
+        payload = {"food_name": rng.choice(self.food_names), "calories": rng.randint(50, 600)}
+        return await client.post("/api/v1/food/log", json=payload, headers=headers)
+
+    async def history(self, client, headers, rng):
+        return await client.get("/api/v1/history/days", params={"limit": 30}, headers=headers)
+
+    async def analyze(self, client, headers, rng):
+        files = {"file": ("plato.jpg", rng.choice(self.images), "image/jpeg")}
+        return await client.post("/api/v1/vision/analyze-food", files=files, headers=headers)
+
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Scenarios, name.strip()):
+            raise SystemExit(f"Escenario desconocido en --mix: {name.strip()!r}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+async def drive(client, scenarios: Scenarios, mix: dict, total: int, concurrency: int):
+    """Lanza `total` peticiones con `concurrency` clientes; devuelve las muestras y los segundos."""
+    plan = scenarios.rng.choices(list(mix), weights=list(mix.values()), k=total)
+    users = [scenarios.rng.randrange(len(scenarios.headers)) for _ in range(total)]
+    # Cada petición sortea sus parámetros con su propio generador: no dependen
+    # de qué cliente termina antes
+    seeds = [scenarios.rng.getrandbits(64) for _ in range(total)]
+    samples = defaultdict(list)   # escenario -> [(segundos, status)]
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            name = plan[index]
+            started = time.perf_counter()
+            try:
+                resp = await getattr(scenarios, name)(client, scenarios.headers[users[index]], random.Random(seeds[index]))
+                status = resp.status_code
+            except Exception as exc:  # la petición ni siquiera obtuvo respuesta
+                status = type(exc).__name__
+            samples[name].append((time.perf_counter() - started, status))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed: float) -> dict:
+    def stats(rows):
+        latencies = sorted(seconds * 1000 for seconds, _ in rows)
+        statuses = defaultdict(int)
+        for _, status in rows:
+            statuses[str(status)] += 1
+        errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "throughput_rps": round(len(rows) / elapsed, 1),
+            "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "status": dict(sorted(statuses.items())),
+        }
+
+    endpoints = {name: stats(rows) for name, rows in sorted(samples.items())}
+    total = stats([row for rows in samples.values() for row in rows])
+    return {"elapsed_s": round(elapsed, 3), "total": total, "endpoints": endpoints}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(report: dict, baseline: dict = None):
+    header = f"{'escenario':<10} {'peticiones':>10} {'errores':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if baseline:
+        header += f" {'Δp95':>8}"
+    print(header, file=sys.stderr)
+    rows = {**report["endpoints"], "TOTAL": report["total"]}
+    old_rows = {**baseline["endpoints"], "TOTAL": baseline["total"]} if baseline else {}
+    for name, row in rows.items():
+        line = (f"{name:<10} {row['requests']:>10} {row['errors']:>8} {row['throughput_rps']:>8.1f} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+        old = old_rows.get(name)
+        if baseline:
+            line += f" {(row['p95_ms'] / old['p95_ms'] - 1) * 100:>+7.1f}%" if old and old["p95_ms"] else f" {'-':>8}"
+        print(line, file=sys.stderr)
+
+
+async def main(args):
+    from main import app
+    from config.database import connect_to_mongo, get_db, DB_NAME
+    import httpx
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+
+    # El lifespan reutiliza este cliente: la app arranca con los datos ya sembrados
+    await connect_to_mongo()
+    started = time.perf_counter()
+    emails, food_names = await seed(get_db(), rng, args.users, args.foods, args.days)
+    print(f"Sembrado {DB_NAME}: {args.users} usuarios, {args.foods} alimentos, "
+          f"{args.days} días/usuario en {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    scenarios = Scenarios(rng, emails, food_names, synthetic_images(rng, args.images))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Calentamiento (conexiones del pool, imports perezosos, cachés): no cuenta
+            await drive(client, scenarios, mix, args.warmup, args.concurrency)
+            samples, elapsed = await drive(client, scenarios, mix, args.requests, args.concurrency)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "db_name": DB_NAME,
+            "vision_backend": os.environ["VISION_BACKEND"],
+            "vision_stub_latency_ms": float(os.environ["VISION_STUB_LATENCY_MS"]),
+            "params": {
+                "users": args.users, "foods": args.foods, "days": args.days, "images": args.images,
+                "requests": args.requests, "warmup": args.warmup, "concurrency": args.concurrency,
+                "mix": mix, "seed": args.seed,
+            },
+        },
+        **summarize(samples, elapsed),
+    }
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--foods", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=90, help="días de historial por usuario")
+    parser.add_argument("--images", type=int, default=20, help="fotos distintas para /analyze-food")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"pesos por escenario (por defecto {DEFAULT_MIX})")
+    parser.add_argument("--vision-latency-ms", type=float, default=200, help="latencia del modelo simulado")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db-name", default="nutrismart_bench", help="se vacía al empezar")
+    parser.add_argument("--output", help="fichero donde guardar el JSON (por defecto, stdout)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.db_name == "nutrismart":
+        raise SystemExit("--db-name no puede ser la base de datos de desarrollo: se vacía al empezar")
+
+    # Antes de importar la app: la configuración se lee al importar los módulos
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["VISION_BACKEND"] = "stub"
+    os.environ["VISION_STUB_LATENCY_MS"] = str(args.vision_latency_ms)
+    os.environ.setdefault("AUTH_SECRET_KEY", "bench-secret-solo-para-medir-el-rendimiento")
+
+    report = asyncio.run(main(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(report, baseline)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
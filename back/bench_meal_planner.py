@@ -0,0 +1,86 @@
+"""
+Benchmark del generador de planes (services/meal_planner.py), sin Mongo.
+
+Carga un catálogo sintético en la matriz de nutrientes y mide:
+- el solver en frío (plan nuevo) para perfiles variados,
+- la misma carga servida desde la caché de planes,
+- el coste de añadir alimentos de uno en uno (altas desde visión).
+
+Uso:
+    python bench_meal_planner.py --foods 50000 --profiles 200
+"""
+import argparse
+import random
+import statistics
+import time
+
+from services.meal_planner import MealPlanner
+
+GOALS = ["Perder peso", "Ganar músculo", "Mantener peso"]
+ALLERGIES = [[], ["Lactosa"], ["Gluten"], ["Frutos secos", "Pescado"], ["Fresa"]]
+WORDS = ["pollo", "arroz", "avena", "salmon", "queso", "pan", "lentejas", "tofu", "almendras", "manzana", "huevo", "pasta"]
+
+
+def make_food(food_id: int, rng: random.Random) -> dict:
+    protein, carbs, fat = rng.uniform(0, 35), rng.uniform(0, 60), rng.uniform(0, 20)
+    return {
+        "id": food_id,
+        "name": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {food_id}",
+        "calories": round(protein * 4 + carbs * 4 + fat * 9) or 10,
+        "protein": protein,
+        "carbs": carbs,
+        "fat": fat,
+    }
+
+
+def make_profile(rng: random.Random) -> dict:
+    return {
+        "goal": rng.choice(GOALS),
+        "caloriesTarget": rng.randrange(1400, 3400, 10),
+        "allergies": rng.choice(ALLERGIES),
+    }
+
+
+def timed(fn, items):
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+    print(f"{label:<26} media {statistics.mean(samples):8.3f} ms   p95 {p95:8.3f} ms   max {samples[-1]:8.3f} ms")
+
+
+def main(foods: int, profiles: int):
+    rng = random.Random(11)
+    planner = MealPlanner()
+
+    started = time.perf_counter()
+    for food_id in range(1, foods + 1):
+        planner.add(make_food(food_id, rng))
+    print(f"Catálogo de {foods} alimentos cargado en {time.perf_counter() - started:.2f}s\n")
+
+    def cold(profile):
+        planner._plans.clear()
+        planner.plan_for(profile)
+
+    requests = [make_profile(rng) for _ in range(profiles)]
+    report("plan en frío", timed(cold, requests))
+    for profile in requests:
+        planner.plan_for(profile)
+    report("plan desde caché", timed(planner.plan_for, requests))
+    report("alta de un alimento", timed(planner.add, [make_food(foods + i, rng) for i in range(1, 1001)]))
+    print(f"\n{planner.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--foods", type=int, default=50000)
+    parser.add_argument("--profiles", type=int, default=200)
+    args = parser.parse_args()
+    main(args.foods, args.profiles)
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark de serialización de respuestas de listas, sin Mongo.
+
+Compara, para respuestas de 100, 1.000 y 10.000 filas, el tiempo de CPU por
+respuesta de:
+- "modelos": el camino anterior, un modelo Pydantic por documento que FastAPI
+  vuelve a validar contra response_model y codifica con json.dumps;
+- "orjson": los documentos ya proyectados devueltos con json_response (sin
+  revalidar, codificados con orjson).
+Usa endpoints reales de FastAPI dentro del proceso, así que incluye todo el
+trabajo del framework.
+
+Uso:
+    python bench_serialization.py --sizes 100,1000,10000 --repeat 20
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+
+from models.nutrition import Notification
+from responses import json_response
+
+
+def make_rows(size: int):
+    return [
+        {"id": i, "type": "alert" if i % 3 else "goal", "title": f"Aviso {i}", "time": "10:30",
+         "description": "Recuerda registrar tu comida y beber agua", "isRead": bool(i % 2)}
+        for i in range(size, 0, -1)
+    ]
+
+
+def build_app(rows_by_size):
+    app = FastAPI()
+
+    @app.get("/models/{size}", response_model=List[Notification])
+    async def with_models(size: int):
+        return [Notification(**row) for row in rows_by_size[size]]
+
+    @app.get("/orjson/{size}", response_model=List[Notification])
+    async def with_orjson(size: int):
+        return json_response(rows_by_size[size])
+
+    return app
+
+
+async def measure(client, path: str, repeat: int):
+    await client.get(path)  # calentamiento
+    started = time.process_time()
+    for _ in range(repeat):
+        response = await client.get(path)
+    return (time.process_time() - started) / repeat, len(response.content)
+
+
+async def main(sizes, repeat: int):
+    rows_by_size = {size: make_rows(size) for size in sizes}
+    app = build_app(rows_by_size)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        print(f"{'filas':>7} {'modelos':>12} {'orjson':>12} {'mejora':>8} {'bytes':>10}")
+        for size in sizes:
+            models_cpu, size_bytes = await measure(client, f"/models/{size}", repeat)
+            orjson_cpu, orjson_bytes = await measure(client, f"/orjson/{size}", repeat)
+            assert abs(size_bytes - orjson_bytes) < size_bytes * 0.2, "las respuestas deberían ser equivalentes"
+            print(f"{size:>7} {models_cpu * 1000:>9.2f} ms {orjson_cpu * 1000:>9.2f} ms "
+                  f"{models_cpu / orjson_cpu:>7.1f}x {orjson_bytes:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main([int(s) for s in args.sizes.split(",")], args.repeat))
@@ -1,24 +1,87 @@
 import os
-from pymongo import MongoClient
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import SecondaryPreferred
 from dotenv import load_dotenv
+from services.metrics import mongo_command_listener, mongo_pool_listener
 
 load_dotenv()
 
 # Asegúrate de que tu .env tenga MONGO_URI="mongodb://localhost:27017/" y DB_NAME="nutrismart"
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DB_NAME = os.getenv("DB_NAME", "nutrismart")
+# Si está activo, el arranque falla si alguna consulta de los routers hace COLLSCAN
+VERIFY_QUERY_PLANS = os.getenv("MONGO_VERIFY_QUERY_PLANS", "false").lower() == "true"
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
 
-# Colecciones mapeadas según tu imagen y requerimientos
-users_collection = db["users"]
-profiles_collection = db["profiles"]
-foods_collection = db["foods"]
-ingestions_collection = db["ingestions"]
-daily_records_collection = db["daily_records"]
-consultations_collection = db["consultations"] # Usado para Citas/Appointments
-notifications_collection = db["notifications"] # Agregamos esta para notificaciones
+def _optional_int(name: str) -> Optional[int]:
+    value = os.getenv(name, "")
+    return int(value) if value else None
 
-def get_db():
-    return db
+
+# Pool de conexiones por worker: con N workers de uvicorn hay hasta N * MONGO_MAX_POOL_SIZE
+# conexiones abiertas. Sin valor se usa el del driver (ver mongo_pool_checkout_wait_seconds en /metrics).
+MONGO_CLIENT_OPTIONS = {
+    option: value for option, value in {
+        "maxPoolSize": _optional_int("MONGO_MAX_POOL_SIZE"),
+        "minPoolSize": _optional_int("MONGO_MIN_POOL_SIZE"),
+        "maxIdleTimeMS": _optional_int("MONGO_MAX_IDLE_TIME_MS"),
+        "waitQueueTimeoutMS": _optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        "serverSelectionTimeoutMS": _optional_int("MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+        "connectTimeoutMS": _optional_int("MONGO_CONNECT_TIMEOUT_MS"),
+        "socketTimeoutMS": _optional_int("MONGO_SOCKET_TIMEOUT_MS"),
+    }.items() if value is not None
+}
+
+# Lecturas que toleran datos algo atrasados (búsqueda del catálogo, historial):
+# si está activo van a un secundario cuando lo hay. Sin replica set no cambia nada.
+MONGO_SECONDARY_READS = os.getenv("MONGO_SECONDARY_READS", "false").lower() == "true"
+# Atraso máximo aceptado del secundario (el servidor exige al menos 90 s; -1 = sin límite)
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "-1"))
+
+# El cliente asíncrono se crea y se cierra en el lifespan de la app (ver main.py),
+# así ningún handler bloquea el event loop esperando a Mongo.
+client: Optional[AsyncIOMotorClient] = None
+
+# Colecciones mapeadas según tu imagen y requerimientos:
+#   users, profiles, foods, ingestions, daily_records,
+#   consultations (Citas/Appointments), notifications
+
+
+async def connect_to_mongo():
+    global client
+    if client is None:
+        # Los listeners miden cada comando y las esperas del pool para /metrics
+        client = AsyncIOMotorClient(
+            MONGO_URI, event_listeners=[mongo_command_listener, mongo_pool_listener], **MONGO_CLIENT_OPTIONS
+        )
+    return client
+
+
+async def close_mongo_connection():
+    global client
+    if client is not None:
+        client.close()
+        client = None
+
+
+def get_db() -> AsyncIOMotorDatabase:
+    """
+    Dependencia de FastAPI que devuelve la base de datos asíncrona.
+    Uso: db = Depends(get_db) y luego await db.profiles.find_one(...)
+    """
+    if client is None:
+        raise RuntimeError("La conexión a MongoDB no está inicializada (¿se ejecutó el lifespan de la app?)")
+    return client[DB_NAME]
+
+
+def get_read_db() -> AsyncIOMotorDatabase:
+    """
+    Como get_db, pero para lecturas que pueden ir a un secundario
+    (MONGO_SECONDARY_READS). No usar si hay que leer lo que se acaba de escribir.
+    """
+    if not MONGO_SECONDARY_READS:
+        return get_db()
+    if client is None:
+        raise RuntimeError("La conexión a MongoDB no está inicializada (¿se ejecutó el lifespan de la app?)")
+    return client.get_database(DB_NAME, read_preference=SecondaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS))
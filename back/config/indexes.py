@@ -0,0 +1,227 @@
+"""
+Manifiesto de índices de MongoDB y verificación de planes de consulta.
+
+- ensure_indexes(db): crea los índices declarados en INDEXES. Es idempotente,
+  se ejecuta en cada arranque desde el lifespan de la app. Si un índice único
+  no se puede crear porque ya hay duplicados (bases de datos anteriores a los
+  upserts atómicos), los fusiona antes de reintentar: los registros diarios
+  de un mismo día se suman, se conserva el perfil más reciente, los
+  alimentos con id repetido reciben uno nuevo y los nombres que normalizan
+  igual se distinguen. En el resto de colecciones se
+  falla indicando qué claves están duplicadas. Si cambia la caducidad de un
+  índice TTL (VISION_CACHE_TTL_SECONDS) se actualiza con collMod.
+- verify_query_plans(db): ejecuta explain() sobre la forma de cada consulta que
+  hacen los routers y lanza RuntimeError si alguna cae en un COLLSCAN.
+
+También se puede lanzar a mano:
+    python -m config.indexes
+"""
+import asyncio
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from services.analysis_cache import VISION_CACHE_TTL_SECONDS
+from services.daily_log import NUTRIENTS
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "profiles": [
+        IndexModel([("user_email", ASCENDING)], unique=True, name="user_email_unique"),
+    ],
+    "foods": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("name", ASCENDING)], name="name"),
+        # Nombre normalizado (services/food_catalog.py): un plato no se duplica
+        IndexModel([("name_key", ASCENDING)], unique=True, name="name_key_unique"),
+    ],
+    "ingestions": [
+        IndexModel([("user_email", ASCENDING), ("date", DESCENDING)], name="user_email_date"),
+    ],
+    "daily_records": [
+        # Un único registro por usuario y día: hace seguro el upsert de /food/log
+        IndexModel([("user_email", ASCENDING), ("date", DESCENDING)], unique=True, name="user_email_date_unique"),
+    ],
+    "notifications": [
+        IndexModel([("user_email", ASCENDING), ("id", DESCENDING)], name="user_email_id"),
+        # Ids globales del contador (services/notifications.py)
+        IndexModel([("id", DESCENDING)], unique=True, name="id_unique"),
+    ],
+    "consultations": [
+        IndexModel([("user_email", ASCENDING), ("_id", DESCENDING)], name="user_email_id"),
+    ],
+    "history_rollups": [
+        # Resúmenes semanales/mensuales (services/daily_log.py)
+        IndexModel([("user_email", ASCENDING), ("period", ASCENDING), ("key", ASCENDING)], unique=True, name="user_period_key_unique"),
+    ],
+    "vision_cache": [
+        # Los análisis cacheados caducan solos
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=VISION_CACHE_TTL_SECONDS, name="created_at_ttl"),
+    ],
+}
+
+# Forma de cada consulta caliente de los routers: (colección, filtro, orden).
+# Los valores son de relleno; al planificador solo le importan los campos.
+_EMAIL = "probe@nutrismart.dev"
+QUERY_SHAPES = [
+    ("auth", "users", {"email": _EMAIL}, None),
+    ("profile/dashboard/plan", "profiles", {"user_email": _EMAIL}, None),
+    ("dashboard", "daily_records", {"user_email": _EMAIL, "date": "2000-01-01"}, None),
+    ("history", "daily_records", {"user_email": _EMAIL}, [("date", DESCENDING)]),
+    ("history/days", "daily_records", {"user_email": _EMAIL, "date": {"$gte": "2000-01-01", "$lt": "2000-02-01"}}, [("date", DESCENDING)]),
+    ("history/rollups", "history_rollups", {"user_email": _EMAIL, "period": "month", "key": {"$gte": "2000-01", "$lte": "2000-12"}}, [("key", ASCENDING)]),
+    ("food/recent", "recent_foods", {"_id": _EMAIL}, None),
+    ("food/recent (backfill)", "ingestions", {"user_email": _EMAIL}, [("date", DESCENDING)]),
+    ("food/recent (fallback)", "foods", {}, [("id", ASCENDING)]),
+    ("food/search (sync)", "foods", {"id": {"$gt": 0}}, [("id", ASCENDING)]),
+    ("food/log + vision", "foods", {"name_key": "probe"}, None),
+    ("food/log/bulk", "foods", {"$or": [{"name_key": {"$in": ["probe"]}}, {"id": {"$in": [1]}}]}, None),
+    ("food/log (food_id)", "foods", {"id": 1}, None),
+    ("catálogo (último id)", "foods", {}, [("id", DESCENDING)]),
+    ("notifications", "notifications", {"user_email": _EMAIL}, [("id", DESCENDING)]),
+    ("notifications/page", "notifications", {"user_email": _EMAIL, "id": {"$lt": 100}, "isRead": False}, [("id", DESCENDING)]),
+    ("notifications/unread-count", "unread_counts", {"_id": _EMAIL}, None),
+    ("notificaciones (último id)", "notifications", {}, [("id", DESCENDING)]),
+    ("appointments", "consultations", {"user_email": _EMAIL}, [("_id", DESCENDING)]),
+]
+
+
+async def ensure_indexes(db):
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except DuplicateKeyError:
+            for index in indexes:
+                if index.document.get("unique"):
+                    await _resolve_duplicates(db, collection_name, [field for field, _ in index.document["key"].items()])
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as error:
+            if error.code != _INDEX_OPTIONS_CONFLICT:
+                raise
+            await _update_ttls(db, collection_name, indexes)
+            await db[collection_name].create_indexes(indexes)
+
+
+_INDEX_OPTIONS_CONFLICT = 85
+
+
+async def _update_ttls(db, collection_name: str, indexes):
+    """Mismo índice con otra caducidad: se cambia en su sitio, sin borrarlo ni reconstruirlo."""
+    for index in indexes:
+        if "expireAfterSeconds" in index.document:
+            await db.command("collMod", collection_name, index={
+                "name": index.document["name"],
+                "expireAfterSeconds": index.document["expireAfterSeconds"],
+            })
+
+
+async def _duplicate_groups(collection, fields):
+    """Grupos de _id que comparten los valores de `fields` (la clave de un índice único)."""
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": {f: f"${f}" for f in fields}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ]
+    return await collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+
+async def _resolve_duplicates(db, collection_name: str, fields):
+    groups = await _duplicate_groups(db[collection_name], fields)
+    if not groups:
+        return
+    merge = _MERGERS.get((collection_name, tuple(fields)))
+    if merge is None:
+        sample = ", ".join(str(group["_id"]) for group in groups[:10])
+        raise RuntimeError(
+            f"No se puede crear el índice único {fields} en {collection_name}: "
+            f"{len(groups)} claves duplicadas (p. ej. {sample}). Corrígelas a mano y reinicia."
+        )
+    for group in groups:
+        docs = await db[collection_name].find({"_id": {"$in": group["ids"]}}).sort("_id", 1).to_list(None)
+        await merge(db, docs)
+
+
+async def _merge_daily_records(db, docs):
+    """Varios registros del mismo día (el antiguo leer-e-insertar de /food/log): se suman."""
+    keep, rest = docs[0], docs[1:]
+    totals = {n: sum(doc.get(n) or 0 for doc in docs) for n in NUTRIENTS if any(n in doc for doc in docs)}
+    await db.daily_records.update_one({"_id": keep["_id"]}, {"$set": totals})
+    await db.daily_records.delete_many({"_id": {"$in": [doc["_id"] for doc in rest]}})
+
+
+async def _merge_profiles(db, docs):
+    """Se conserva el perfil guardado más tarde (mayor revision y, a igualdad, el último insertado)."""
+    keep = max(enumerate(docs), key=lambda item: (item[1].get("revision", 0), item[0]))[1]
+    await db.profiles.delete_many({"_id": {"$in": [doc["_id"] for doc in docs if doc is not keep]}})
+
+
+async def _renumber_foods(db, docs):
+    """Alimentos con el mismo id (el antiguo max+1): el primero lo conserva, el resto recibe uno nuevo."""
+    from services.food_catalog import allocate_food_ids
+
+    rest = docs[1:]
+    last_food = await db.foods.find_one(sort=[("id", DESCENDING)], projection={"id": 1})
+    await db.counters.update_one({"_id": "foods"}, {"$max": {"seq": last_food["id"]}}, upsert=True)
+    for doc, food_id in zip(rest, await allocate_food_ids(db, len(rest))):
+        await db.foods.update_one({"_id": doc["_id"]}, {"$set": {"id": food_id}})
+
+
+async def _disambiguate_name_keys(db, docs):
+    from services.food_catalog import disambiguate_name_keys
+
+    await disambiguate_name_keys(db, docs)
+
+
+_MERGERS = {
+    ("daily_records", ("user_email", "date")): _merge_daily_records,
+    ("profiles", ("user_email",)): _merge_profiles,
+    ("foods", ("id",)): _renumber_foods,
+    ("foods", ("name_key",)): _disambiguate_name_keys,
+}
+
+
+def _plan_stages(plan):
+    """Recorre el árbol del plan (formato clásico o SBE) y devuelve todas las etapas."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def verify_query_plans(db):
+    failures = []
+    for route, collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            failures.append(f"{route}: {collection_name}.find({query}, sort={sort}) -> {stages}")
+
+    if failures:
+        raise RuntimeError(
+            "Consultas sin índice (COLLSCAN) detectadas:\n  " + "\n  ".join(failures)
+        )
+
+
+async def _main():
+    from config.database import connect_to_mongo, close_mongo_connection, get_db
+    await connect_to_mongo()
+    try:
+        db = get_db()
+        await ensure_indexes(db)
+        await verify_query_plans(db)
+        print(f"✅ Índices aplicados y {len(QUERY_SHAPES)} consultas verificadas sin COLLSCAN.")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,9 +1,11 @@
-from fastapi import Header, HTTPException, status
+from fastapi import Header, HTTPException, Query, status
+from services.security import InvalidToken, token_verifier
 
 async def get_current_user_email(authorization: str = Header(None)):
     """
-    Extrae el email del usuario desde el 'fake token' enviado por el frontend.
-    Formato esperado header: 'Bearer email@dominio.com-fake-jwt-token'
+    Extrae el email del usuario del token firmado que devuelve /auth/login.
+    Formato esperado header: 'Bearer <token>'
+    La verificación es local (firma HMAC y caducidad), sin consultar Mongo.
     """
     if not authorization:
         raise HTTPException(
@@ -14,19 +16,34 @@ async def get_current_user_email(authorization: str = Header(None)):
     try:
         # El frontend envía "Bearer <token>"
         scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Esquema de autenticación inválido",
-            )
-            
-        # Nuestra lógica de token fake en auth.py era: f"{email}-fake-jwt-token"
-        # Así que para recuperar el email, quitamos el sufijo.
-        email = token.replace("-fake-jwt-token", "")
-        return email
-        
-    except Exception:
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido o mal formado",
-        )
\ No newline at end of file
+        )
+    if scheme.lower() != 'bearer':
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Esquema de autenticación inválido",
+        )
+
+    return _verify(token)
+
+async def get_stream_user_email(authorization: str = Header(None), token: str = Query(None)):
+    """
+    Para los streams SSE: EventSource no puede enviar cabeceras, así que el
+    token también se acepta como ?token=. Si llega la cabecera, manda ella.
+    """
+    if authorization or not token:
+        return await get_current_user_email(authorization)
+    return _verify(token)
+
+def _verify(token: str) -> str:
+    try:
+        return token_verifier.verify(token)
+    except InvalidToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o caducado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,5 +1,20 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+
+from config.database import connect_to_mongo, close_mongo_connection, get_db, VERIFY_QUERY_PLANS
+from config.indexes import ensure_indexes, verify_query_plans
+from services.food_search import food_search_index
+from services.meal_planner import meal_planner
+from services.notifications import bootstrap_notifications
+from services.food_catalog import bootstrap_catalog
+from services.daily_log import bootstrap_rollups
+from services.event_bus import event_bus
+from services.inference_pool import inference_pool
+from services.metrics import MetricsMiddleware
+from services.profiling import ProfilingMiddleware
 
 # Importar routers
 from routers.auth import router as auth_router
@@ -11,22 +26,57 @@ from routers.food import router as food_router
 from routers.dashboard import router as dashboard_router
 from routers.notifications import router as notifications_router
 from routers.appointments import router as appointments_router
+from routers.home import router as home_router
+from routers.metrics import router as metrics_router
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El cliente de Mongo vive lo mismo que la app
+    await connect_to_mongo()
+    await bootstrap_catalog(get_db())
+    await ensure_indexes(get_db())
+    await bootstrap_notifications(get_db())
+    await bootstrap_rollups(get_db())
+    if VERIFY_QUERY_PLANS:
+        await verify_query_plans(get_db())
+    await food_search_index.load(get_db())
+    await meal_planner.load(get_db())
+    await event_bus.start(get_db())
+    yield
+    await event_bus.stop()
+    inference_pool.shutdown()
+    await close_mongo_connection()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Nutri-Smart API",
     version="1.0",
     description="API para la aplicación de nutrición Nutri-Smart"
 )
 
 # --- Middlewares ---
+# Comprime las respuestas grandes (catálogo, historial...) si el cliente lo acepta
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.getenv("GZIP_MINIMUM_SIZE", "1024")),
+    compresslevel=int(os.getenv("GZIP_COMPRESS_LEVEL", "6")),
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Permitir todos los orígenes para desarrollo
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Has-More", "ETag", "X-Profile-File"],
 )
 
+# Perfilado bajo demanda (X-Profile) o por muestreo; no hace nada si PROFILING_ENABLED=false
+app.add_middleware(ProfilingMiddleware)
+
+# El último en añadirse es el más externo: mide la petición completa
+app.add_middleware(MetricsMiddleware)
+
 # --- Routers ---
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["Auth"])
 app.include_router(profile_router, prefix="/api/v1/profile", tags=["Profile"])
@@ -37,6 +87,8 @@ app.include_router(food_router, prefix="/api/v1/food", tags=["Food"])
 app.include_router(dashboard_router, prefix="/api/v1/dashboard", tags=["Dashboard"])
 app.include_router(notifications_router, prefix="/api/v1/notifications", tags=["Notifications"])
 app.include_router(appointments_router, prefix="/api/v1/appointments", tags=["Appointments"])
+app.include_router(home_router, prefix="/api/v1/home", tags=["Home"])
+app.include_router(metrics_router, tags=["Metrics"])
 
 
 @app.get("/", tags=["Health"])
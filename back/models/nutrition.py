@@ -10,11 +10,18 @@ class NutritionProfile(BaseModel):
     activityLevel: str
     allergies: List[str] = []
 
+class PlanFood(BaseModel):
+    id: int
+    name: str
+    servings: float # Raciones del catálogo
+    kcal: int
+
 class Meal(BaseModel):
     type: str
     name: str
     kcal: int
     macros: str
+    foods: Optional[List[PlanFood]] = None # Alimentos del catálogo que componen la comida
 
 class HistoryDay(BaseModel):
     date: str
@@ -22,11 +29,27 @@ class HistoryDay(BaseModel):
     target: int
     status: str
 
+class HistoryPage(BaseModel):
+    items: List[dict] # Solo los campos pedidos en ?fields=
+    next_cursor: Optional[str] = None
+
+class HistoryRollup(BaseModel):
+    period: str # "week" o "month"
+    key: str # "2026-W42" o "2026-10"
+    days: int # Días con registros en el periodo
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+
 class FoodItem(BaseModel):
     id: int # Mantuvimos IDs numéricos en el seed para compatibilidad
     name: str
     detail: str
 
+class LoggedFood(FoodItem):
+    ingestion_id: str # Para editar o borrar la ingesta después
+
 class FoodAnalysis(BaseModel):
     is_food: bool
     name: Optional[str] = None
@@ -35,6 +58,15 @@ class FoodAnalysis(BaseModel):
     fat: Optional[int] = None
     message: Optional[str] = None
 
+class MealTotal(BaseModel):
+    calories: int
+    protein: int
+    fat: int
+
+class BatchFoodAnalysis(BaseModel):
+    results: List[FoodAnalysis]
+    total: MealTotal
+
 class Notification(BaseModel):
     id: int
     type: str
@@ -43,6 +75,10 @@ class Notification(BaseModel):
     description: str
     isRead: bool
 
+class NotificationPage(BaseModel):
+    items: List[Notification]
+    next_cursor: Optional[int] = None
+
 class Appointment(BaseModel):
     date: str
     time: str
@@ -0,0 +1,75 @@
+"""
+Respuestas JSON sin doble validación.
+
+Los endpoints de listas (historial, notificaciones, búsqueda, recientes)
+proyectan desde Mongo exactamente los campos de su response_model y devuelven
+los documentos tal cual en una ORJSONResponse: FastAPI no vuelve a validar ni
+a convertir cada elemento (el response_model queda solo para la
+documentación) y orjson codifica mucho más rápido que json.dumps.
+Quien use json_response es responsable de que los datos ya tengan la forma
+del modelo declarado.
+
+Los endpoints cacheables (catálogo, plan, perfil) añaden un ETag calculado a
+partir de contadores de versión que ya están en memoria (revisión del
+catálogo indexado, "revision" del perfil en la caché de perfiles): si el
+cliente envía el mismo ETag en If-None-Match se responde 304 sin cuerpo y sin
+consultar Mongo.
+"""
+import hashlib
+import os
+from typing import Optional
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+# Catálogo: igual para todos, se puede reutilizar un rato sin preguntar
+CATALOG_CACHE_CONTROL = f"public, max-age={int(os.getenv('CATALOG_MAX_AGE_SECONDS', '60'))}"
+# Datos del usuario: solo en su dispositivo y revalidando siempre (un 304 cuesta casi nada)
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def json_response(content, status_code: int = 200, headers: dict = None) -> ORJSONResponse:
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def etag_for(*parts) -> str:
+    """ETag débil (el cuerpo puede ir comprimido o no) a partir de las versiones de los datos."""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def cache_headers(etag: str, cache_control: str, vary: str = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def not_modified(if_none_match: Optional[str], etag: str, headers: dict) -> Optional[Response]:
+    """Respuesta 304 si el cliente ya tiene esta versión, o None."""
+    if not if_none_match:
+        return None
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates or _weak(etag) in (_weak(tag) for tag in candidates):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def _weak(tag: str) -> str:
+    return tag if tag.startswith("W/") else f"W/{tag}"
+
+
+def to_json_bytes(value) -> bytes:
+    """JSON de lo que devuelve un handler: una Response ya codificada, modelos o datos planos."""
+    if isinstance(value, Response):
+        return value.body
+    if isinstance(value, BaseModel):
+        return value.model_dump_json().encode()
+    return orjson.dumps(value, default=_encode_model)
+
+
+def _encode_model(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends
 from typing import Optional
 from models.nutrition import Appointment
-from config.database import consultations_collection
+from config.database import get_db
 from dependencies import get_current_user_email
+from services.notifications import create_notification
 
 router = APIRouter()
 
 @router.get("/", response_model=Optional[Appointment])
-async def get_next_appointment(user_email: str = Depends(get_current_user_email)):
-    cita = consultations_collection.find_one(
+async def get_next_appointment(user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    cita = await db.consultations.find_one(
         {"user_email": user_email},
         sort=[("_id", -1)]
     )
@@ -17,12 +18,16 @@ async def get_next_appointment(user_email: str = Depends(get_current_user_email)
     return None
 
 @router.post("/", response_model=Appointment)
-async def schedule_appointment(appointment: Appointment, user_email: str = Depends(get_current_user_email)):
-    consultations_collection.insert_one({
+async def schedule_appointment(appointment: Appointment, user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    await db.consultations.insert_one({
         "user_email": user_email,
         "date": appointment.date,
         "time": appointment.time,
         "type": appointment.type,
         "status": "scheduled"
     })
-    return appointment
\ No newline at end of file
+    await create_notification(
+        db, user_email, "info", "Cita agendada",
+        f"{appointment.type}: {appointment.date} a las {appointment.time}"
+    )
+    return appointment
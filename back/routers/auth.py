@@ -1,21 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from models.user import User, UserCreate, Token
-from config.database import users_collection
+from config.database import get_db
+from services.security import create_access_token, hash_password_async, needs_rehash, verify_password_async
 from datetime import datetime
 
 router = APIRouter()
 
 @router.post("/register", response_model=User)
-async def register(user_in: UserCreate):
+async def register(user_in: UserCreate, db = Depends(get_db)):
     # Verificar si existe
-    if users_collection.find_one({"email": user_in.email}):
+    if await db.users.find_one({"email": user_in.email}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    hashed_password = user_in.password + "-hashed"
+    # scrypt es lento a propósito: se calcula fuera del event loop
+    hashed_password = await hash_password_async(user_in.password)
     
     new_user = {
         "email": user_in.email,
@@ -24,24 +26,25 @@ async def register(user_in: UserCreate):
         "created_at": datetime.now()
     }
     
-    users_collection.insert_one(new_user)
+    await db.users.insert_one(new_user)
     
     # Retornar sin el campo _id de mongo y sin password
     return User(email=new_user["email"], name=new_user["name"])
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user_db = users_collection.find_one({"email": form_data.username})
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_db)):
+    user_db = await db.users.find_one({"email": form_data.username})
     
     if not user_db:
+        # Mismo coste que una contraseña incorrecta, para no revelar qué emails existen
+        await verify_password_async(form_data.password)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verificación simple de hash
-    is_password_correct = (form_data.password + "-hashed") == user_db["password"]
+    is_password_correct = await verify_password_async(form_data.password, user_db["password"])
     if not is_password_correct:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -49,7 +52,14 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    access_token = f"{user_db['email']}-fake-jwt-token"
+    # Contraseñas antiguas o con parámetros de scrypt anteriores: se actualizan ahora
+    if needs_rehash(user_db["password"]):
+        await db.users.update_one(
+            {"_id": user_db["_id"]},
+            {"$set": {"password": await hash_password_async(form_data.password)}}
+        )
+
+    access_token = create_access_token(user_db["email"])
     
     user_response = {
         "name": user_db["name"],
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from config.database import profiles_collection, daily_records_collection
+from config.database import get_db
 from dependencies import get_current_user_email
+from services.profile_cache import profile_cache
+from services.daily_log import MACROS
 from datetime import datetime
 
 router = APIRouter()
@@ -21,9 +23,9 @@ class DashboardData(BaseModel):
     macros: Macros
 
 @router.get("/", response_model=DashboardData)
-async def get_dashboard_data(user_email: str = Depends(get_current_user_email)):
+async def get_dashboard_data(user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
     # 1. Obtener Perfil
-    profile = profiles_collection.find_one({"user_email": user_email})
+    profile = await profile_cache.get(db, user_email)
     
     target_kcal = 1800
     target_protein = 140
@@ -40,19 +42,24 @@ async def get_dashboard_data(user_email: str = Depends(get_current_user_email)):
     # 2. Obtener Consumo de Hoy
     # Usamos el mismo formato estandarizado YYYY-MM-DD
     today_str = datetime.now().date().isoformat()
-    daily = daily_records_collection.find_one({"user_email": user_email, "date": today_str})
+    daily = await db.daily_records.find_one({"user_email": user_email, "date": today_str})
     
     consumed_kcal = daily["calories"] if daily else 0
-    
-    # Cálculo simple de progreso de macros basado en el % de calorías consumidas
-    ratio = consumed_kcal / target_kcal if target_kcal > 0 else 0
-    
+
+    if daily and "protein" not in daily:
+        # Registros antiguos sin macros: estimación según el % de calorías consumidas
+        ratio = consumed_kcal / target_kcal if target_kcal > 0 else 0
+        consumed = {"protein": target_protein * ratio, "carbs": target_carbs * ratio, "fat": target_fat * ratio}
+    else:
+        # Totales reales que mantiene cada log/edición/borrado (services/daily_log.py)
+        consumed = {macro: daily.get(macro, 0) if daily else 0 for macro in MACROS}
+
     return DashboardData(
         caloriesTarget=target_kcal,
         caloriesConsumed=consumed_kcal,
         macros=Macros(
-            protein=MacroDetail(current=int(target_protein * ratio), target=target_protein),
-            carbs=MacroDetail(current=int(target_carbs * ratio), target=target_carbs),
-            fat=MacroDetail(current=int(target_fat * ratio), target=target_fat)
+            protein=MacroDetail(current=int(consumed["protein"]), target=target_protein),
+            carbs=MacroDetail(current=int(consumed["carbs"]), target=target_carbs),
+            fat=MacroDetail(current=int(consumed["fat"]), target=target_fat)
         )
     )
\ No newline at end of file
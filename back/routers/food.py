@@ -1,104 +1,299 @@
-from fastapi import APIRouter, Depends
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from typing import Annotated, List, Optional
 from pydantic import BaseModel
-from models.nutrition import FoodItem
-from config.database import foods_collection, ingestions_collection, daily_records_collection, profiles_collection
+from models.nutrition import FoodItem, LoggedFood
+from config.database import get_db, get_read_db
 from dependencies import get_current_user_email
+from services.food_search import food_search_index, normalize_text
+from services.profile_cache import profile_cache
+from services.daily_log import NUTRIENTS, nutrients_for, add_to_daily_record, forget_day_if_empty, negate, difference
+from services import recent_foods as recent_foods_service
+from routers.plan import meals_for_profile
+from responses import CATALOG_CACHE_CONTROL, cache_headers, etag_for, json_response, not_modified
 from datetime import datetime
+from bson import ObjectId
+import asyncio
+import os
 import re
 
 router = APIRouter()
 
+BULK_LOG_MAX_ITEMS = int(os.getenv("BULK_LOG_MAX_ITEMS", "50"))
+
 @router.get("/recent", response_model=List[FoodItem])
-async def get_recent_foods(user_email: str = Depends(get_current_user_email)):
-    cursor = ingestions_collection.find({"user_email": user_email}).sort("date", -1).limit(10)
-    recent_foods = []
-    
-    # Usamos un set para evitar duplicados visuales en recientes si se desea
-    seen_names = set()
-    
-    for ing in cursor:
-        if ing["food_name"] not in seen_names:
-            recent_foods.append(FoodItem(
-                id=ing.get("food_id", 0),
-                name=ing["food_name"],
-                detail=f"1 porción • {ing['calories']} Kcal"
-            ))
-            seen_names.add(ing["food_name"])
-    
+async def get_recent_foods(user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    recent_foods = await recent_foods_service.get_recent_foods(db, user_email)
+
     # Si no hay recientes, devolvemos algunos por defecto
     if not recent_foods:
-        cursor_foods = foods_collection.find().limit(5)
-        for food in cursor_foods:
-            recent_foods.append(FoodItem(id=food["id"], name=food["name"], detail=food["detail"]))
+        cursor_foods = db.foods.find({}, {"_id": 0, "id": 1, "name": 1, "detail": 1}).sort("id", 1).limit(5)
+        recent_foods = await cursor_foods.to_list(None)
             
-    return recent_foods
+    return json_response(recent_foods)
 
 # --- NUEVO ENDPOINT DE BÚSQUEDA GLOBAL ---
 @router.get("/search", response_model=List[FoodItem])
-async def search_foods(q: Optional[str] = ""):
+async def search_foods(
+    q: Optional[str] = "",
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    db = Depends(get_read_db)
+):
     """
-    Busca alimentos en la base de datos global.
-    Si q está vacío, devuelve todos (o un límite).
-    Si q tiene texto, filtra por nombre (case insensitive).
+    Busca alimentos en el catálogo global usando el índice en memoria.
+    Si q está vacío, devuelve el catálogo por orden de id (100 por página).
+    Si q tiene texto, busca por nombre ignorando tildes y mayúsculas y ordena
+    por relevancia (50 por página). X-Has-More indica si hay otra página.
+    El ETag depende de la revisión del catálogo indexado y de la consulta.
     """
-    if q:
-        # Búsqueda por regex insensible a mayúsculas/minúsculas
-        regex_pattern = re.compile(f".*{re.escape(q)}.*", re.IGNORECASE)
-        cursor = foods_collection.find({"name": {"$regex": regex_pattern}}).limit(50)
-    else:
-        # Si no hay query, devolvemos los primeros 100 para mostrar la lista completa
-        cursor = foods_collection.find().limit(100)
-
-    results = []
-    for food in cursor:
-        results.append(FoodItem(
-            id=food["id"],
-            name=food["name"],
-            detail=food["detail"]
-        ))
-    
-    return results
+    if limit is None:
+        limit = 50 if q else 100
+
+    await food_search_index.sync(db)
+    etag = etag_for("search", food_search_index.revision, q or "", limit, offset)
+    headers = cache_headers(etag, CATALOG_CACHE_CONTROL)
+    unchanged = not_modified(if_none_match, etag, headers)
+    if unchanged:
+        return unchanged
+
+    foods, has_more = food_search_index.search(q or "", limit=limit, offset=offset)
+    # Los alimentos del índice ya tienen exactamente los campos de FoodItem
+    return json_response(foods, headers={**headers, "X-Has-More": "true" if has_more else "false"})
 
 class LogFoodRequest(BaseModel):
     food_name: str
     calories: int = 300
+    # Opcionales: si no se envían se calculan desde el catálogo
+    protein: Optional[float] = None
+    carbs: Optional[float] = None
+    fat: Optional[float] = None
+    # Alimento del catálogo ya resuelto (p. ej. los del plan): manda sobre food_name
+    food_id: Optional[int] = None
+    servings: float = 1
+
+class UpdateLogRequest(BaseModel):
+    calories: int
+    protein: Optional[float] = None
+    carbs: Optional[float] = None
+    fat: Optional[float] = None
 
-@router.post("/log", response_model=FoodItem)
-async def log_food(request: LogFoodRequest, user_email: str = Depends(get_current_user_email)):
-    food_in_db = foods_collection.find_one({"name": request.food_name})
+class BulkLogRequest(BaseModel):
+    items: List[LogFoodRequest] = []
+    # Registrar comidas del plan (/api/v1/plan) en lugar de (o además de) items.
+    # meal_types filtra por tipo ("Desayuno", "Cena"...); sin él, el plan entero.
+    from_plan: bool = False
+    meal_types: Optional[List[str]] = None
+
+FOOD_NUTRIENTS_PROJECTION = {"id": 1, "name_key": 1, "calories": 1, "protein": 1, "carbs": 1, "fat": 1}
+
+@router.post("/log", response_model=LoggedFood)
+async def log_food(request: LogFoodRequest, user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    # Las dos lecturas son independientes: se lanzan a la vez
+    food_in_db, profile = await asyncio.gather(
+        db.foods.find_one(_catalog_query(request), FOOD_NUTRIENTS_PROJECTION),
+        profile_cache.get(db, user_email)
+    )
     food_id = food_in_db["id"] if food_in_db else 9999
-    
-    # 1. Registrar Ingesta
+    target = profile.get("caloriesTarget", 1800) if profile else 1800
+    nutrients = nutrients_for(food_in_db, request.calories, {
+        "protein": request.protein, "carbs": request.carbs, "fat": request.fat
+    })
+
+    now = datetime.now()
+    today_str = now.date().isoformat()
+
+    # 1. Registrar Ingesta, 2. acumular en el registro diario y 3. actualizar
+    # los recientes, enviados juntos.
+    # El acumulado es un único upsert atómico con $inc: logs concurrentes del
+    # mismo usuario ya no se pisan entre sí.
     ingestion = {
+        "_id": ObjectId(),
         "user_email": user_email,
         "food_id": food_id,
         "food_name": request.food_name,
-        "calories": request.calories,
-        "date": datetime.now()
+        **nutrients,
+        "date": now
     }
-    ingestions_collection.insert_one(ingestion)
-    
-    # 2. Actualizar registro diario
-    today_str = datetime.now().date().isoformat()
-    daily = daily_records_collection.find_one({"user_email": user_email, "date": today_str})
-    
-    if daily:
-        new_calories = daily["calories"] + request.calories
-        daily_records_collection.update_one(
-            {"_id": daily["_id"]},
-            {"$set": {"calories": new_calories}}
+    await asyncio.gather(
+        db.ingestions.insert_one(ingestion),
+        add_to_daily_record(db, user_email, today_str, nutrients, target),
+        recent_foods_service.push_recent_foods(db, user_email, [
+            recent_foods_service.recent_item(food_id, request.food_name, request.calories)
+        ])
+    )
+
+    return LoggedFood(
+        id=food_id,
+        name=request.food_name,
+        detail=_detail(request.servings, request.calories),
+        ingestion_id=str(ingestion["_id"])
+    )
+
+@router.post("/log/bulk", response_model=List[LoggedFood])
+async def log_foods_bulk(request: BulkLogRequest, user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    """
+    Registra varias comidas de una vez (p. ej. el día completo del plan).
+    Coste casi constante con el número de items: una búsqueda $in en el
+    catálogo, un insert_many y un único $inc con la suma en el registro diario.
+    """
+    profile = await profile_cache.get(db, user_email)
+    items = list(request.items)
+    if request.from_plan:
+        items += [
+            item for meal in meals_for_profile(profile)
+            if request.meal_types is None or meal["type"] in request.meal_types
+            for item in _plan_meal_requests(meal)
+        ]
+    if not items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No hay comidas que registrar.")
+    if len(items) > BULK_LOG_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se admiten como máximo {BULK_LOG_MAX_ITEMS} comidas por petición."
         )
-    else:
-        profile = profiles_collection.find_one({"user_email": user_email})
-        target = profile.get("caloriesTarget", 1800) if profile else 1800
-        
-        daily_records_collection.insert_one({
+
+    name_keys = {normalize_text(item.food_name) for item in items if item.food_id is None}
+    food_ids = {item.food_id for item in items if item.food_id is not None}
+    foods_by_key, foods_by_id = {}, {}
+    query = {"$or": [{"name_key": {"$in": list(name_keys)}}, {"id": {"$in": list(food_ids)}}]}
+    async for food in db.foods.find(query, FOOD_NUTRIENTS_PROJECTION):
+        foods_by_key[food["name_key"]] = food
+        foods_by_id[food["id"]] = food
+    target = profile.get("caloriesTarget", 1800) if profile else 1800
+
+    now = datetime.now()
+    ingestions = []
+    totals = dict.fromkeys(NUTRIENTS, 0)
+    for item in items:
+        if item.food_id is not None:
+            food_in_db = foods_by_id.get(item.food_id)
+        else:
+            food_in_db = foods_by_key.get(normalize_text(item.food_name))
+        nutrients = nutrients_for(food_in_db, item.calories, {
+            "protein": item.protein, "carbs": item.carbs, "fat": item.fat
+        })
+        for k in NUTRIENTS:
+            totals[k] += nutrients[k]
+        ingestions.append({
+            "_id": ObjectId(),
             "user_email": user_email,
-            "date": today_str,
-            "calories": request.calories,
-            "target": target,
-            "status": "inprogress"
+            "food_id": food_in_db["id"] if food_in_db else 9999,
+            "food_name": item.food_name,
+            **nutrients,
+            "date": now
         })
-    
-    return FoodItem(id=food_id, name=request.food_name, detail=f"1 porción • {request.calories} Kcal")
\ No newline at end of file
+    details = [_detail(item.servings, ing["calories"]) for item, ing in zip(items, ingestions)]
+
+    await asyncio.gather(
+        db.ingestions.insert_many(ingestions),
+        add_to_daily_record(db, user_email, now.date().isoformat(), totals, target),
+        recent_foods_service.push_recent_foods(db, user_email, [
+            recent_foods_service.recent_item(ing["food_id"], ing["food_name"], ing["calories"]) for ing in ingestions
+        ])
+    )
+
+    return [
+        LoggedFood(
+            id=ing["food_id"],
+            name=ing["food_name"],
+            detail=detail,
+            ingestion_id=str(ing["_id"])
+        )
+        for ing, detail in zip(ingestions, details)
+    ]
+
+def _catalog_query(request: LogFoodRequest) -> dict:
+    if request.food_id is not None:
+        return {"id": request.food_id}
+    return {"name_key": normalize_text(request.food_name)}
+
+def _detail(servings: float, calories: int) -> str:
+    return f"{servings:g} {'porción' if servings == 1 else 'porciones'} • {calories} Kcal"
+
+def _plan_meal_requests(meal: dict) -> List[LogFoodRequest]:
+    """
+    Las comidas generadas por el planificador se registran alimento a
+    alimento (su nombre compuesto no está en el catálogo); las de los planes
+    fijos, como una sola ingesta.
+    """
+    if meal.get("foods"):
+        return [
+            LogFoodRequest(food_name=food["name"], calories=food["kcal"], food_id=food["id"], servings=food["servings"])
+            for food in meal["foods"]
+        ]
+    # Los macros del plan vienen como texto: "30P • 50C • 10G"
+    grams = {letter: float(value) for value, letter in re.findall(r"(\d+(?:\.\d+)?)\s*([PCG])", meal.get("macros", ""))}
+    return [LogFoodRequest(
+        food_name=meal["name"],
+        calories=meal["kcal"],
+        protein=grams.get("P"),
+        carbs=grams.get("C"),
+        fat=grams.get("G")
+    )]
+
+@router.put("/log/{ingestion_id}", response_model=LoggedFood)
+async def update_logged_food(
+    ingestion_id: str,
+    request: UpdateLogRequest,
+    user_email: str = Depends(get_current_user_email),
+    db = Depends(get_db)
+):
+    """
+    Cambia la cantidad de una ingesta. Si no se envían macros, se escalan los
+    de la ingesta original a las nuevas calorías. El registro del día se
+    corrige con la diferencia.
+    """
+    query = {"_id": _parse_ingestion_id(ingestion_id), "user_email": user_email}
+    for _ in range(3):
+        old = await db.ingestions.find_one(query)
+        if not old:
+            raise _ingestion_not_found()
+
+        new = nutrients_for(old, request.calories, {
+            "protein": request.protein, "carbs": request.carbs, "fat": request.fat
+        })
+        # Control optimista: solo se aplica si nadie la editó entre medias. Las
+        # ingestas antiguas no tienen todos los macros: esos deben seguir sin estar.
+        unchanged = {k: old[k] if k in old else {"$exists": False} for k in NUTRIENTS}
+        result = await db.ingestions.update_one(
+            {**query, **unchanged},
+            {"$set": new}
+        )
+        if result.matched_count:
+            await add_to_daily_record(db, user_email, old["date"].date().isoformat(), difference(new, old))
+            return LoggedFood(
+                id=old.get("food_id", 0),
+                name=old["food_name"],
+                detail=f"1 porción • {request.calories} Kcal",
+                ingestion_id=ingestion_id
+            )
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="La ingesta se modificó a la vez desde otro sitio, inténtalo de nuevo."
+    )
+
+@router.delete("/log/{ingestion_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_logged_food(ingestion_id: str, user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    removed = await db.ingestions.find_one_and_delete(
+        {"_id": _parse_ingestion_id(ingestion_id), "user_email": user_email}
+    )
+    if not removed:
+        raise _ingestion_not_found()
+
+    date_str = removed["date"].date().isoformat()
+    await add_to_daily_record(
+        db, user_email, date_str,
+        negate({k: removed.get(k) or 0 for k in NUTRIENTS}),
+        count_day=False
+    )
+    await forget_day_if_empty(db, user_email, date_str)
+
+def _parse_ingestion_id(ingestion_id: str) -> ObjectId:
+    if not ObjectId.is_valid(ingestion_id):
+        raise _ingestion_not_found()
+    return ObjectId(ingestion_id)
+
+def _ingestion_not_found():
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingesta no encontrada")
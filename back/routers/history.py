@@ -1,20 +1,84 @@
-from fastapi import APIRouter, Depends
-from typing import List
-from models.nutrition import HistoryDay
-from config.database import daily_records_collection
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from models.nutrition import HistoryDay, HistoryPage, HistoryRollup
+from config.database import get_read_db
 from dependencies import get_current_user_email
+from services.daily_log import NUTRIENTS, month_key, week_key
+from responses import json_response
 
 router = APIRouter()
 
+# Campos que se pueden pedir en /days?fields=; "date" siempre se devuelve
+DAY_FIELDS = (*NUTRIENTS, "target", "status")
+
+HISTORY_DAY_PROJECTION = {"_id": 0, "date": 1, "calories": 1, "target": 1, "status": 1}
+
 @router.get("/", response_model=List[HistoryDay])
-async def get_history(user_email: str = Depends(get_current_user_email)):
-    cursor = daily_records_collection.find({"user_email": user_email}).sort("date", -1).limit(7)
-    history = []
-    for day in cursor:
-        history.append(HistoryDay(
-            date=day["date"], # Ahora será YYYY-MM-DD, que es ordenable
-            calories=day["calories"],
-            target=day["target"],
-            status=day["status"]
-        ))
-    return history
\ No newline at end of file
+async def get_history(user_email: str = Depends(get_current_user_email), db = Depends(get_read_db)):
+    # date en formato YYYY-MM-DD, que es ordenable
+    cursor = db.daily_records.find({"user_email": user_email}, HISTORY_DAY_PROJECTION).sort("date", -1).limit(7)
+    return json_response(await cursor.to_list(None))
+
+@router.get("/days", response_model=HistoryPage)
+async def get_history_days(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    cursor: Optional[date] = None,
+    limit: int = Query(30, ge=1, le=366),
+    fields: Optional[str] = None,
+    user_email: str = Depends(get_current_user_email),
+    db = Depends(get_read_db)
+):
+    """
+    Días registrados del más reciente al más antiguo, paginados por fecha
+    (keyset): next_cursor es la fecha del último día devuelto y la siguiente
+    página empieza justo antes, sin skip. Lee del índice (user_email, date).
+    """
+    requested = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(DAY_FIELDS)
+    unknown = sorted(set(requested) - set(DAY_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(unknown)}")
+
+    date_range = {}
+    if date_from:
+        date_range["$gte"] = date_from.isoformat()
+    if date_to:
+        date_range["$lte"] = date_to.isoformat()
+    if cursor:
+        date_range["$lt"] = cursor.isoformat()
+    query = {"user_email": user_email}
+    if date_range:
+        query["date"] = date_range
+
+    projection = {"_id": 0, "date": 1, **{f: 1 for f in requested}}
+    # Se pide uno de más para saber si hay otra página
+    days = await db.daily_records.find(query, projection).sort("date", -1).limit(limit + 1).to_list(None)
+    next_cursor = days[limit - 1]["date"] if len(days) > limit else None
+    return json_response({"items": days[:limit], "next_cursor": next_cursor})
+
+@router.get("/rollups", response_model=List[HistoryRollup])
+async def get_history_rollups(
+    period: str = Query("week", pattern="^(week|month)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    user_email: str = Depends(get_current_user_email),
+    db = Depends(get_read_db)
+):
+    """Totales por semana ISO o por mes, precalculados en cada log (ver services/daily_log.py)."""
+    to_key = week_key if period == "week" else month_key
+    key_range = {}
+    if date_from:
+        key_range["$gte"] = to_key(date_from)
+    if date_to:
+        key_range["$lte"] = to_key(date_to)
+    query = {"user_email": user_email, "period": period}
+    if key_range:
+        query["key"] = key_range
+
+    projection = {"_id": 0, "period": 1, "key": 1, "days": 1, **{n: 1 for n in NUTRIENTS}}
+    rollups = []
+    async for rollup in db.history_rollups.find(query, projection).sort("key", 1):
+        rollup["days"] = len(rollup.get("days", []))
+        rollups.append({**dict.fromkeys(NUTRIENTS, 0), **rollup})
+    return json_response(rollups)
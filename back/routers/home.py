@@ -0,0 +1,63 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Optional
+from pydantic import BaseModel
+from models.nutrition import NutritionProfile, Meal, HistoryDay, FoodItem, Notification, Appointment
+from config.database import get_db
+from dependencies import get_current_user_email
+from routers.profile import get_profile
+from routers.plan import get_meal_plan
+from routers.dashboard import get_dashboard_data, DashboardData
+from routers.history import get_history
+from routers.food import get_recent_foods
+from routers.notifications import get_notifications
+from routers.appointments import get_next_appointment
+from responses import to_json_bytes
+
+router = APIRouter()
+
+# Sección de la respuesta -> handler que la calcula
+SECTIONS = {
+    "profile": get_profile,
+    "plan": get_meal_plan,
+    "dashboard": get_dashboard_data,
+    "history": get_history,
+    "recent_foods": get_recent_foods,
+    "notifications": get_notifications,
+    "appointment": get_next_appointment,
+}
+
+class HomeData(BaseModel):
+    profile: Optional[NutritionProfile] = None
+    plan: Optional[List[Meal]] = None
+    dashboard: Optional[DashboardData] = None
+    history: Optional[List[HistoryDay]] = None
+    recent_foods: Optional[List[FoodItem]] = None
+    notifications: Optional[List[Notification]] = None
+    appointment: Optional[Appointment] = None
+
+@router.get("/", response_model=HomeData, response_model_exclude_unset=True)
+async def get_home(
+    sections: Optional[str] = Query(None, description=f"Secciones separadas por comas ({', '.join(SECTIONS)}). Por defecto, todas."),
+    user_email: str = Depends(get_current_user_email),
+    db = Depends(get_db)
+):
+    """
+    Todo lo que necesita la pantalla de inicio en una sola petición.
+    Las secciones se consultan en paralelo, así que el tiempo de respuesta lo
+    marca la más lenta y no la suma de todas.
+    """
+    requested = list(SECTIONS) if not sections else [s.strip() for s in sections.split(",") if s.strip()]
+    unknown = [s for s in requested if s not in SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Secciones desconocidas: {', '.join(unknown)}"
+        )
+    requested = list(dict.fromkeys(requested))
+
+    results = await asyncio.gather(*(SECTIONS[name](user_email=user_email, db=db) for name in requested))
+    # Cada handler ya devuelve datos con la forma de su modelo (o la respuesta
+    # ya codificada): se concatenan sin volver a validar con HomeData.
+    body = b",".join(b'"%s":%s' % (name.encode(), to_json_bytes(result)) for name, result in zip(requested, results))
+    return Response(b"{" + body + b"}", media_type="application/json")
@@ -1,22 +1,96 @@
-from fastapi import APIRouter, Depends
-from typing import List
-from models.nutrition import Notification
-from config.database import notifications_collection
-from dependencies import get_current_user_email
+import asyncio
+import json
+import os
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from pydantic import BaseModel
+from models.nutrition import Notification, NotificationPage
+from config.database import get_db
+from dependencies import get_current_user_email, get_stream_user_email
+from services.notifications import NOTIFICATION_PROJECTION, mark_as_read, notification_hub, unread_count
+from responses import json_response
 
 router = APIRouter()
 
+NOTIFICATIONS_PAGE_SIZE = int(os.getenv("NOTIFICATIONS_PAGE_SIZE", "20"))
+NOTIFICATIONS_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATIONS_HEARTBEAT_SECONDS", "15"))
+
+class MarkReadRequest(BaseModel):
+    ids: Optional[List[int]] = None # Sin ids se marcan todas
+
+class UnreadCount(BaseModel):
+    unread: int
+
 @router.get("/", response_model=List[Notification])
-async def get_notifications(user_email: str = Depends(get_current_user_email)):
-    cursor = notifications_collection.find({"user_email": user_email})
-    notifs = []
-    for n in cursor:
-        notifs.append(Notification(
-            id=n["id"],
-            type=n["type"],
-            title=n["title"],
-            time=n["time"],
-            description=n["description"],
-            isRead=n["isRead"]
-        ))
-    return notifs
\ No newline at end of file
+async def get_notifications(user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    """Las más recientes (primera página); el resto con /page?cursor=."""
+    return json_response((await _page(db, user_email, None, NOTIFICATIONS_PAGE_SIZE, False))["items"])
+
+@router.get("/page", response_model=NotificationPage)
+async def get_notifications_page(
+    cursor: Optional[int] = None,
+    limit: int = Query(NOTIFICATIONS_PAGE_SIZE, ge=1, le=100),
+    unread_only: bool = False,
+    user_email: str = Depends(get_current_user_email),
+    db = Depends(get_db)
+):
+    """
+    De la más nueva a la más antigua, paginadas por id: next_cursor es el id
+    de la última devuelta y la siguiente página empieza justo antes.
+    """
+    return json_response(await _page(db, user_email, cursor, limit, unread_only))
+
+@router.get("/unread-count", response_model=UnreadCount)
+async def get_unread_count(user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    return UnreadCount(unread=await unread_count(db, user_email))
+
+@router.post("/read", response_model=UnreadCount)
+async def mark_notifications_read(request: MarkReadRequest, user_email: str = Depends(get_current_user_email), db = Depends(get_db)):
+    return UnreadCount(unread=await mark_as_read(db, user_email, request.ids))
+
+@router.get("/stream")
+async def stream_notifications(request: Request, user_email: str = Depends(get_stream_user_email), db = Depends(get_db)):
+    """
+    Server-Sent Events: al conectar envía el contador ("unread") y después
+    cada notificación nueva ("notification") y cada cambio del contador.
+    Desde el navegador se abre con EventSource y el token en ?token=.
+    """
+    queue = notification_hub.connect(user_email)
+    unread = await unread_count(db, user_email)
+
+    async def events():
+        try:
+            yield _sse("unread", {"unread": unread})
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), NOTIFICATIONS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n" # mantiene viva la conexión a través de proxies
+                    continue
+                yield _sse(event, data)
+        finally:
+            notification_hub.disconnect(user_email, queue)
+
+    # Content-Encoding: identity hace que GZipMiddleware no la toque: comprimida,
+    # cada evento se quedaría en el buffer de gzip en vez de llegar al cliente.
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Content-Encoding": "identity"}
+    )
+
+async def _page(db, user_email: str, cursor: Optional[int], limit: int, unread_only: bool) -> dict:
+    query = {"user_email": user_email}
+    if cursor is not None:
+        query["id"] = {"$lt": cursor}
+    if unread_only:
+        query["isRead"] = False
+    # Se pide una de más para saber si hay otra página
+    found = await db.notifications.find(query, NOTIFICATION_PROJECTION).sort("id", -1).limit(limit + 1).to_list(None)
+    items = found[:limit]
+    next_cursor = items[-1]["id"] if len(found) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
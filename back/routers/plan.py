@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends
-from typing import List
+import asyncio
+from fastapi import APIRouter, Depends, Header
+from typing import Annotated, List, Optional
 from models.nutrition import Meal
-from config.database import profiles_collection
+from config.database import get_db
 from dependencies import get_current_user_email
+from services.profile_cache import profile_cache
+from services.meal_planner import meal_planner
+from responses import PRIVATE_CACHE_CONTROL, cache_headers, etag_for, json_response, not_modified
 
 router = APIRouter()
 
+# Planes fijos: solo se usan si el catálogo no permite generar uno
 MEALS_WEIGHT_LOSS = [
   { "type": "Desayuno", "name": "Avena con proteína", "kcal": 450, "macros": "30P • 50C • 10G" },
   { "type": "Almuerzo", "name": "Pollo a la plancha y arroz", "kcal": 600, "macros": "45P • 60C • 15G" },
@@ -20,11 +25,27 @@ MEALS_MUSCLE = [
   { "type": "Cena", "name": "Salmón y Papa", "kcal": 600, "macros": "40P • 40C • 20G" },
 ]
 
-@router.get("/", response_model=List[Meal])
-async def get_meal_plan(user_email: str = Depends(get_current_user_email)):
-    profile = profiles_collection.find_one({"user_email": user_email})
-    
+def meals_for_profile(profile: dict) -> List[dict]:
+    meals = meal_planner.plan_for(profile)
+    if meals:
+        return meals
+
     if profile and profile.get("goal") == "Ganar músculo":
         return MEALS_MUSCLE
-        
-    return MEALS_WEIGHT_LOSS
\ No newline at end of file
+
+    return MEALS_WEIGHT_LOSS
+
+@router.get("/", response_model=List[Meal])
+async def get_meal_plan(
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    user_email: str = Depends(get_current_user_email),
+    db = Depends(get_db)
+):
+    """El plan solo cambia con el perfil o el catálogo: su ETag sale de las dos revisiones."""
+    profile, _ = await asyncio.gather(profile_cache.get(db, user_email), meal_planner.sync(db))
+    etag = etag_for("plan", user_email, (profile or {}).get("revision", 0), meal_planner.catalog_revision)
+    headers = cache_headers(etag, PRIVATE_CACHE_CONTROL, vary="Authorization")
+    unchanged = not_modified(if_none_match, etag, headers)
+    if unchanged:
+        return unchanged
+    return json_response(meals_for_profile(profile), headers=headers)
\ No newline at end of file
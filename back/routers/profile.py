@@ -1,15 +1,31 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
+from typing import Annotated, Optional
+from pymongo import ReturnDocument
 from models.nutrition import NutritionProfile
-from config.database import profiles_collection
+from config.database import get_db
 from dependencies import get_current_user_email # Importamos la dependencia
+from services.profile_cache import profile_cache
+from responses import PRIVATE_CACHE_CONTROL, cache_headers, etag_for, json_response, not_modified
 
 router = APIRouter()
 
 @router.get("/", response_model=NutritionProfile)
-async def get_profile(user_email: str = Depends(get_current_user_email)):
+async def get_profile(
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    user_email: str = Depends(get_current_user_email),
+    db = Depends(get_db)
+):
     # Usamos el email extraído del token
-    profile = profiles_collection.find_one({"user_email": user_email})
-    
+    profile = await profile_cache.get(db, user_email)
+
+    etag = etag_for("profile", user_email, profile.get("revision", 0) if profile else "none")
+    headers = cache_headers(etag, PRIVATE_CACHE_CONTROL, vary="Authorization")
+    unchanged = not_modified(if_none_match, etag, headers)
+    if unchanged:
+        return unchanged
+    return json_response(_profile_model(profile).model_dump(), headers=headers)
+
+def _profile_model(profile: Optional[dict]) -> NutritionProfile:
     if not profile:
         return NutritionProfile(
             goal='No definido', weight=0, height=0, age=0, 
@@ -29,7 +45,8 @@ async def get_profile(user_email: str = Depends(get_current_user_email)):
 @router.post("/", response_model=NutritionProfile)
 async def create_or_update_profile(
     profile_data: NutritionProfile, 
-    user_email: str = Depends(get_current_user_email)
+    user_email: str = Depends(get_current_user_email),
+    db = Depends(get_db)
 ):
     profile_dict = profile_data.dict()
     profile_dict["user_email"] = user_email
@@ -53,9 +70,14 @@ async def create_or_update_profile(
         "fat": int((tdee * 0.3) / 9)
     }
 
-    profiles_collection.update_one(
+    # revision sube en cada cambio: de ella salen los ETag de /profile y /plan
+    saved = await db.profiles.find_one_and_update(
         {"user_email": user_email},
-        {"$set": profile_dict},
-        upsert=True
+        {"$set": profile_dict, "$inc": {"revision": 1}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    # Write-through: la caché queda al día y los demás workers descartan su copia
+    await profile_cache.write_through(db, user_email, saved)
     return profile_data
\ No newline at end of file
@@ -1,57 +1,116 @@
+import asyncio
+import os
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from models.nutrition import FoodAnalysis
-from services.gemini_service import analyze_image_nutrition
+from models.nutrition import FoodAnalysis, BatchFoodAnalysis, MealTotal
+from services.vision_backend import analyze_image_nutrition
+from services.food_catalog import register_foods
+from services.analysis_cache import analysis_cache, image_key
+from services.inference_pool import inference_pool, InferencePoolFull, InferenceTimeout, VISION_RETRY_AFTER_SECONDS
 
-from config.database import foods_collection
+from config.database import get_db
 
 router = APIRouter()
 
+# Máximo de fotos por petición en /analyze-foods
+VISION_BATCH_MAX_IMAGES = int(os.getenv("VISION_BATCH_MAX_IMAGES", "8"))
+
 @router.post("/analyze-food", response_model=FoodAnalysis)
-async def analyze_food_image(file: UploadFile = File(...)):
+async def analyze_food_image(file: UploadFile = File(...), db = Depends(get_db)):
     """
     Endpoint para analizar una imagen de comida.
     Recibe un archivo de imagen y devuelve un análisis nutricional.
     """
+    _check_is_image(file)
+    image_bytes = await file.read()
+
+    [analysis_result] = await _analyze_images(db, [image_bytes])
+    return _to_food_analysis(analysis_result)
+
+@router.post("/analyze-foods", response_model=BatchFoodAnalysis)
+async def analyze_food_images(files: List[UploadFile] = File(...), db = Depends(get_db)):
+    """
+    Analiza varias fotos de una misma comida en una sola petición.
+    Las imágenes se analizan en paralelo (respetando los límites del pool de
+    inferencia), los alimentos nuevos se guardan con una única escritura masiva
+    y se devuelve el análisis de cada foto junto con el total de la comida.
+    """
+    if len(files) > VISION_BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se admiten como máximo {VISION_BATCH_MAX_IMAGES} imágenes por petición."
+        )
+    for file in files:
+        _check_is_image(file)
+    images = await asyncio.gather(*(file.read() for file in files))
+
+    results = [_to_food_analysis(r) for r in await _analyze_images(db, images)]
+    foods = [r for r in results if r.is_food]
+
+    return BatchFoodAnalysis(
+        results=results,
+        total=MealTotal(
+            calories=sum(r.calories or 0 for r in foods),
+            protein=sum(r.protein or 0 for r in foods),
+            fat=sum(r.fat or 0 for r in foods)
+        )
+    )
+
+@router.get("/stats")
+async def get_inference_stats():
+    """Profundidad de la cola, tiempos de espera y latencia del modelo."""
+    return inference_pool.stats()
+
+def _check_is_image(file: UploadFile):
     if not file.content_type.startswith("image/"):
         raise HTTPException(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
             detail="El archivo debe ser una imagen."
         )
 
-    image_bytes = await file.read()
-    
-    analysis_result = analyze_image_nutrition(image_bytes)
-
+def _to_food_analysis(analysis_result: dict) -> FoodAnalysis:
     if not analysis_result["is_food"]:
         return FoodAnalysis(is_food=False, message=analysis_result.get("message"))
 
-    # Lógica para guardar el alimento si es nuevo
-    food_name = analysis_result.get("name", "Alimento Desconocido")
-    
-    # Buscar si ya existe (case insensitive)
-    import re
-    existing_food = foods_collection.find_one({"name": {"$regex": f"^{re.escape(food_name)}$", "$options": "i"}})
-    
-    if not existing_food:
-        # Generar nuevo ID (encontrando el max actual + 1)
-        # Nota: Esto no es thread-safe en alta concurrencia pero sirve para este MVP/demo
-        last_food = foods_collection.find_one(sort=[("id", -1)])
-        new_id = (last_food["id"] + 1) if last_food else 1
-        
-        new_food = {
-            "id": new_id,
-            "name": food_name,
-            "detail": f"1 porción • {analysis_result.get('calories')} Kcal",
-            "calories": analysis_result.get("calories"),
-            "protein": analysis_result.get("protein"),
-            "fat": analysis_result.get("fat")
-        }
-        foods_collection.insert_one(new_food)
-
     return FoodAnalysis(
         is_food=True,
-        name=food_name,
+        name=analysis_result.get("name", "Alimento Desconocido"),
         calories=analysis_result.get("calories"),
         protein=analysis_result.get("protein"),
         fat=analysis_result.get("fat")
     )
+
+async def _analyze_images(db, images: List[bytes]) -> List[dict]:
+    """Devuelve el resultado del modelo para cada imagen, en el mismo orden."""
+    keys = [image_key(image_bytes) for image_bytes in images]
+    image_by_key = dict(zip(keys, images))  # fotos repetidas se analizan una vez
+
+    # La misma foto ya analizada (p. ej. un reintento del cliente) sale de caché
+    unique_keys = list(image_by_key)
+    cached = await asyncio.gather(*(analysis_cache.get(db, key) for key in unique_keys))
+    result_by_key = dict(zip(unique_keys, cached))
+
+    missing = [key for key in unique_keys if result_by_key[key] is None]
+    if missing:
+        fresh = await asyncio.gather(*(_run_inference(image_by_key[key]) for key in missing))
+        result_by_key.update(zip(missing, fresh))
+
+        await register_foods(db, [r for r in fresh if r["is_food"]])
+        await asyncio.gather(*(analysis_cache.put(db, key, result_by_key[key]) for key in missing))
+
+    return [result_by_key[key] for key in keys]
+
+async def _run_inference(image_bytes: bytes) -> dict:
+    try:
+        return await inference_pool.run(analyze_image_nutrition, image_bytes)
+    except InferencePoolFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El servicio de análisis está saturado, inténtalo de nuevo en unos segundos.",
+            headers={"Retry-After": str(VISION_RETRY_AFTER_SECONDS)}
+        )
+    except InferenceTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="El análisis de la imagen tardó demasiado."
+        )
@@ -1,8 +1,9 @@
-from config.database import (
-    users_collection, profiles_collection, foods_collection, 
-    ingestions_collection, daily_records_collection, 
-    notifications_collection, consultations_collection
-)
+from pymongo import MongoClient
+from config.database import MONGO_URI, DB_NAME
+from services.food_search import normalize_text
+from services.daily_log import rollup_rebuild_pipeline
+from services.security import hash_password
+from config.indexes import INDEXES
 from datetime import datetime, timedelta
 import random
 
@@ -49,6 +50,19 @@ food_data = [
 
 
 def seed():
+    # El seed es un script síncrono: usa su propio cliente pymongo en lugar del
+    # cliente asíncrono que gestiona el lifespan de la API.
+    client = MongoClient(MONGO_URI)
+    db = client[DB_NAME]
+    users_collection = db["users"]
+    profiles_collection = db["profiles"]
+    foods_collection = db["foods"]
+    ingestions_collection = db["ingestions"]
+    daily_records_collection = db["daily_records"]
+    notifications_collection = db["notifications"]
+    consultations_collection = db["consultations"]
+    counters_collection = db["counters"]
+
     # ... (limpieza e inserción de foods y users igual que antes) ...
     # (Copiar la lógica de limpieza e inserts de foods/users del script anterior)
     
@@ -58,24 +72,30 @@ def seed():
     foods_collection.delete_many({})
     ingestions_collection.delete_many({})
     daily_records_collection.delete_many({})
+    db["history_rollups"].delete_many({})
+    db["recent_foods"].delete_many({})
+    db["unread_counts"].delete_many({})
     notifications_collection.delete_many({})
     consultations_collection.delete_many({})
 
     # ... Insertar foods (copiar del script anterior) ...
     for idx, food in enumerate(food_data, 1):
         food["id"] = idx 
+        food["name_key"] = normalize_text(food["name"])
     foods_collection.insert_many(food_data)
+    # Los siguientes ids los reparte el contador (ver services/food_catalog.py)
+    counters_collection.update_one({"_id": "foods"}, {"$set": {"seq": len(food_data)}}, upsert=True)
 
     # ... Insertar usuarios y perfiles (copiar del script anterior) ...
     # Usuario 1: Carla
-    user1 = {"email": "carla.fit@smartfit.com", "name": "Carla Fit", "password": "password123-hashed", "created_at": datetime.now()}
+    user1 = {"email": "carla.fit@smartfit.com", "name": "Carla Fit", "password": hash_password("password123"), "created_at": datetime.now()}
     users_collection.insert_one(user1)
     profiles_collection.insert_one({
         "user_email": user1["email"], "goal": "Perder peso", "weight": 70.5, "height": 170, "age": 28, "sex": "Femenino", "activityLevel": "Moderado", "allergies": ["Lactosa"], "caloriesTarget": 1800, "macros": {"protein": 140, "carbs": 180, "fat": 60}
     })
 
     # Usuario 2: Renzo
-    user2 = {"email": "renzo.strong@smartfit.com", "name": "Renzo Strong", "password": "gymrat-hashed", "created_at": datetime.now()}
+    user2 = {"email": "renzo.strong@smartfit.com", "name": "Renzo Strong", "password": hash_password("gymrat"), "created_at": datetime.now()}
     users_collection.insert_one(user2)
     profiles_collection.insert_one({
         "user_email": user2["email"], "goal": "Ganar músculo", "weight": 82.0, "height": 180, "age": 25, "sex": "Masculino", "activityLevel": "Intenso", "allergies": [], "caloriesTarget": 2800, "macros": {"protein": 200, "carbs": 350, "fat": 80}
@@ -92,6 +112,9 @@ def seed():
             "user_email": user1["email"],
             "date": today,
             "calories": 1200,
+            "protein": 90,
+            "carbs": 110,
+            "fat": 40,
             "target": 1800,
             "status": "inprogress"
         },
@@ -99,18 +122,33 @@ def seed():
             "user_email": user1["email"],
             "date": yesterday,
             "calories": 1750,
+            "protein": 135,
+            "carbs": 170,
+            "fat": 58,
             "target": 1800,
             "status": "success"
         }
     ])
     
+    # Resúmenes semanales/mensuales del historial sembrado ($merge necesita el índice único)
+    db["history_rollups"].create_indexes(INDEXES["history_rollups"])
+    for period in ("week", "month"):
+        daily_records_collection.aggregate(rollup_rebuild_pipeline(period))
+
     # ... (Resto de notificaciones igual) ...
     notifications_collection.insert_many([
         {"id": 1, "user_email": user1["email"], "type": "alert", "title": "Hidratación", "time": "10 min", "description": "Beber agua", "isRead": False},
         {"id": 2, "user_email": user2["email"], "type": "goal", "title": "Meta Proteína", "time": "1h", "description": "Logrado", "isRead": True}
     ])
+    counters_collection.update_one({"_id": "notifications"}, {"$set": {"seq": 2}}, upsert=True)
+    for row in notifications_collection.aggregate([
+        {"$match": {"isRead": False}},
+        {"$group": {"_id": "$user_email", "unread": {"$sum": 1}}}
+    ]):
+        db["unread_counts"].insert_one(row)
 
     print("✅ Base de datos reparada y lista.")
+    client.close()
 
 if __name__ == "__main__":
     seed()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Caché de análisis de imágenes direccionada por contenido.
+
+La clave es el SHA-256 de los bytes de la imagen, así que un cliente que
+reintenta con la misma foto no vuelve a pagar la llamada a Gemini. Dos niveles:
+1. LRU en memoria del worker, acotado por tamaño (bytes del JSON del resultado).
+2. Colección "vision_cache" en Mongo con índice TTL, compartida entre workers.
+
+Solo se guardan resultados definitivos (comida reconocida o "no es comida");
+los errores del modelo o de red nunca se cachean.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+VISION_CACHE_TTL_SECONDS = int(os.getenv("VISION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+VISION_CACHE_MAX_BYTES = int(os.getenv("VISION_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+
+def image_key(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def is_cacheable(result: dict) -> bool:
+    return not result.get("error")
+
+
+class AnalysisCache:
+    def __init__(self, max_bytes: int = VISION_CACHE_MAX_BYTES, ttl_seconds: int = VISION_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # clave -> (resultado, tamaño, caduca_en)
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db, key: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            result, _, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(result)
+            self._evict(key)
+
+        doc = await db.vision_cache.find_one({"_id": key}, {"result": 1, "created_at": 1})
+        if doc is None:
+            self.misses += 1
+            return None
+
+        # El TTL de Mongo borra con retraso: respetamos la caducidad al leer
+        age = (datetime.utcnow() - doc["created_at"]).total_seconds()
+        if age >= self.ttl_seconds:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._remember(key, doc["result"], self.ttl_seconds - age)
+        return dict(doc["result"])
+
+    async def put(self, db, key: str, result: dict):
+        if not is_cacheable(result):
+            return
+        self._remember(key, result, self.ttl_seconds)
+        await db.vision_cache.update_one(
+            {"_id": key},
+            {"$set": {"result": result, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    def _remember(self, key: str, result: dict, ttl: float):
+        size = len(json.dumps(result, ensure_ascii=False))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (dict(result), size, time.monotonic() + ttl)
+        self._size += size
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+
+    def _evict(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+# Instancia compartida por el worker
+analysis_cache = AnalysisCache()
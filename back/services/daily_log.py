@@ -0,0 +1,160 @@
+"""
+Acumulados diarios de lo que come cada usuario.
+
+Cada ingesta guarda su vector de nutrientes (calorías, proteína, carbohidratos
+y grasa) y el documento de "daily_records" del día mantiene los totales,
+actualizados con $inc atómicos al registrar, editar o borrar una ingesta. Así
+el dashboard lee los macros reales de un solo documento sin agregar nada.
+
+Con el mismo delta se actualizan los resúmenes semanales y mensuales de
+"history_rollups": una gráfica de 12 meses lee 12 documentos, no 365. Cada
+resumen lleva también la lista de días con ingestas; al borrar la última de
+un día, el día sale de la lista. En el arranque, si aún no hay resúmenes, se
+calculan a partir de daily_records (bootstrap_rollups).
+"""
+import asyncio
+from datetime import date, datetime, time, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+NUTRIENTS = ("calories", "protein", "carbs", "fat")
+MACROS = ("protein", "carbs", "fat")
+
+
+def nutrients_for(food: dict, calories: int, overrides: dict = None) -> dict:
+    """
+    Vector de nutrientes de una ingesta de `calories` kcal de `food`.
+    Los macros del catálogo se escalan a las calorías registradas; los que
+    vengan en overrides (valores explícitos del cliente) mandan.
+    """
+    vector = {"calories": calories}
+    food = food or {}
+    food_calories = food.get("calories") or 0
+    factor = calories / food_calories if food_calories > 0 else 0
+    for macro in MACROS:
+        # Un campo a null en el catálogo cuenta como 0
+        vector[macro] = round((food.get(macro) or 0) * factor, 1)
+    for macro, value in (overrides or {}).items():
+        if value is not None:
+            vector[macro] = value
+    return vector
+
+
+def negate(vector: dict) -> dict:
+    return {k: -v for k, v in vector.items()}
+
+
+def difference(new: dict, old: dict) -> dict:
+    return {k: (new.get(k) or 0) - (old.get(k) or 0) for k in NUTRIENTS}
+
+
+def week_key(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(day: date) -> str:
+    return day.isoformat()[:7]
+
+
+def rollup_keys(date_str: str) -> dict:
+    day = date.fromisoformat(date_str)
+    return {"week": week_key(day), "month": month_key(day)}
+
+
+async def add_to_daily_record(db, user_email: str, date_str: str, delta: dict, target: int = None,
+                              count_day: bool = True):
+    """
+    Suma delta a los totales del día con un único upsert atómico. Si el día
+    aún no existe se crea con el objetivo calórico (target) del perfil.
+    Los resúmenes de la semana y el mes se actualizan a la vez; con
+    count_day=False (borrado de una ingesta) el día no se añade a su lista
+    de días, de eso se encarga forget_day_if_empty.
+    """
+    query = {"user_email": user_email, "date": date_str}
+    increments = {k: delta.get(k, 0) for k in NUTRIENTS}
+    update = {"$inc": increments}
+    if target is not None:
+        update["$setOnInsert"] = {"target": target, "status": "inprogress"}
+
+    async def update_day():
+        try:
+            await db.daily_records.update_one(query, update, upsert=target is not None)
+        except DuplicateKeyError:
+            # Dos upserts simultáneos del primer log del día: el índice único
+            # (user_email, date) rechaza al segundo, que ya encuentra el documento.
+            await db.daily_records.update_one(query, update, upsert=True)
+
+    await asyncio.gather(update_day(), _add_to_rollups(db, user_email, date_str, increments, count_day))
+
+
+async def _add_to_rollups(db, user_email: str, date_str: str, increments: dict, count_day: bool):
+    update = {"$inc": increments}
+    if count_day:
+        update["$addToSet"] = {"days": date_str}
+    operations = [
+        UpdateOne({"user_email": user_email, "period": period, "key": key}, update, upsert=True)
+        for period, key in rollup_keys(date_str).items()
+    ]
+    try:
+        await db.history_rollups.bulk_write(operations, ordered=False)
+    except BulkWriteError as error:
+        # Mismo caso que en update_day: se reintentan los upserts que chocaron
+        failed = [operations[e["index"]] for e in error.details["writeErrors"] if e["code"] == 11000]
+        if len(failed) != len(error.details["writeErrors"]):
+            raise
+        await db.history_rollups.bulk_write(failed, ordered=False)
+
+
+async def forget_day_if_empty(db, user_email: str, date_str: str):
+    """
+    Tras borrar una ingesta: si el día se ha quedado sin ninguna, deja de
+    contar en los días de sus resúmenes.
+    """
+    start = datetime.combine(date.fromisoformat(date_str), time.min)
+    day = {"user_email": user_email, "date": {"$gte": start, "$lt": start + timedelta(days=1)}}
+    if await db.ingestions.find_one(day, {"_id": 1}):
+        return
+
+    rollups = [{"user_email": user_email, "period": period, "key": key} for period, key in rollup_keys(date_str).items()]
+    await asyncio.gather(*(db.history_rollups.update_one(query, {"$pull": {"days": date_str}}) for query in rollups))
+    # Si entre la comprobación y el $pull se registró algo ese día, se vuelve a contar
+    if await db.ingestions.find_one(day, {"_id": 1}):
+        await asyncio.gather(*(db.history_rollups.update_one(query, {"$addToSet": {"days": date_str}}) for query in rollups))
+
+
+async def bootstrap_rollups(db):
+    """
+    Se ejecuta en el arranque (tras ensure_indexes, $merge necesita el índice
+    único): si aún no hay resúmenes (primera vez o base anterior a ellos), los
+    calcula a partir de daily_records. Después solo se mantienen con deltas.
+    """
+    if await db.history_rollups.estimated_document_count():
+        return
+    for period in ("week", "month"):
+        await db.daily_records.aggregate(rollup_rebuild_pipeline(period)).to_list(None)
+
+
+def rollup_rebuild_pipeline(period: str):
+    """
+    Agregación que recalcula desde cero los resúmenes de un periodo a partir
+    de daily_records (para datos sembrados o anteriores a los resúmenes).
+    """
+    if period == "week":
+        key = {"$dateToString": {"format": "%G-W%V", "date": {"$dateFromString": {"dateString": "$date"}}}}
+    else:
+        key = {"$substrBytes": ["$date", 0, 7]}
+    # Los días que se quedaron a cero (se borraron todas sus ingestas) no cuentan
+    counted_day = {"$cond": [{"$gt": ["$calories", 0]}, "$date", "$$REMOVE"]}
+    group = {"_id": {"user_email": "$user_email", "key": key}, "days": {"$addToSet": counted_day}}
+    for nutrient in NUTRIENTS:
+        group[nutrient] = {"$sum": {"$ifNull": [f"${nutrient}", 0]}}
+    return [
+        {"$group": group},
+        {"$project": {
+            "_id": 0, "user_email": "$_id.user_email", "period": {"$literal": period}, "key": "$_id.key",
+            "days": 1, **{nutrient: 1 for nutrient in NUTRIENTS}
+        }},
+        {"$merge": {"into": "history_rollups", "on": ["user_email", "period", "key"],
+                    "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
@@ -0,0 +1,106 @@
+"""
+Bus de eventos entre workers de uvicorn sobre MongoDB.
+
+Cada worker es un proceso con su propia memoria; cuando uno cambia algo que
+otros tienen en caché (p. ej. un perfil) publica un evento en "events", una
+colección capped. Todos los workers siguen esa colección con un cursor
+tailable (funciona también con un Mongo standalone, sin replica set) y
+despachan cada evento a los handlers suscritos a su tópico.
+
+El worker que publica entrega el evento a sus propios handlers en el acto y
+lo ignora cuando vuelve por el cursor.
+
+Los eventos se leen en el orden natural de la colección (el de inserción en
+el servidor), no por _id: los ObjectId los genera cada cliente y entre
+workers solo están ordenados al segundo, así que filtrar por _id > último
+perdería eventos. Al (re)abrir el cursor se recorre la colección desde el
+principio y se salta hasta el último evento visto.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from pymongo import CursorType
+
+EVENTS_COLLECTION_BYTES = int(os.getenv("EVENTS_COLLECTION_BYTES", str(16 * 1024 * 1024)))
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._handlers = defaultdict(list)
+        self._task = None
+
+    def subscribe(self, topic: str, handler):
+        """handler(payload) puede ser una función normal o una corrutina."""
+        self._handlers[topic].append(handler)
+
+    async def publish(self, db, topic: str, payload: dict):
+        await self._dispatch(topic, payload)
+        await db.events.insert_one({
+            "topic": topic,
+            "payload": payload,
+            "origin": self.worker_id,
+            "at": datetime.utcnow()
+        })
+
+    async def start(self, db):
+        if "events" not in await db.list_collection_names():
+            try:
+                await db.create_collection("events", capped=True, size=EVENTS_COLLECTION_BYTES)
+            except Exception:
+                pass  # otro worker la creó a la vez
+        # Un cursor tailable sobre una colección capped vacía muere al instante
+        marker = await db.events.insert_one({"topic": "worker.started", "origin": self.worker_id, "at": datetime.utcnow()})
+        self._task = asyncio.create_task(self._tail(db, marker.inserted_id))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _tail(self, db, last_id):
+        while True:
+            try:
+                cursor = db.events.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                caught_up = False
+                while cursor.alive:
+                    async for event in cursor:
+                        if not caught_up:
+                            caught_up = event["_id"] == last_id
+                            continue
+                        last_id = event["_id"]
+                        if event["origin"] != self.worker_id:
+                            await self._dispatch(event["topic"], event.get("payload", {}))
+                    if not caught_up:
+                        # El último visto ya se sobrescribió (la colección capped dio la
+                        # vuelta): lo que hubo entre medias se perdió, se sigue desde aquí
+                        logger.warning("Eventos perdidos: la colección de eventos se llenó antes de leerlos")
+                        caught_up = True
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error siguiendo la colección de eventos; reintentando")
+            await asyncio.sleep(1)
+
+    async def _dispatch(self, topic: str, payload: dict):
+        for handler in self._handlers.get(topic, ()):
+            try:
+                result = handler(payload)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception("Error en el handler del evento %s", topic)
+
+
+# Instancia compartida por el worker
+event_bus = EventBus()
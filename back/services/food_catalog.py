@@ -0,0 +1,112 @@
+"""
+Altas en el catálogo de alimentos seguras ante concurrencia.
+
+- Los ids salen de un contador en la colección "counters" incrementado con
+  findOneAndUpdate + $inc, así dos análisis simultáneos nunca reciben el mismo.
+- Cada alimento guarda "name_key" (nombre normalizado, ver normalize_text) con
+  índice único: "¿ya existe?" es una búsqueda puntual por índice y el alta es
+  un upsert con $setOnInsert, de modo que un mismo plato no se duplica.
+"""
+from typing import List
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from services.food_search import food_search_index, normalize_text
+from services.meal_planner import meal_planner
+
+_DUPLICATE_KEY = 11000
+
+
+_BACKFILL_BATCH = 1000
+
+
+async def bootstrap_catalog(db):
+    """
+    Se ejecuta en el arranque, antes de crear los índices: rellena name_key en
+    los alimentos antiguos y alinea el contador de ids con el máximo existente.
+    Los nombres antiguos que normalizan igual ("Platano" y "Plátano") se
+    separan al crear el índice único (ver disambiguate_name_keys).
+    """
+    operations = []
+    async for food in db.foods.find({"name_key": {"$exists": False}}, {"name": 1}):
+        operations.append(UpdateOne({"_id": food["_id"]}, {"$set": {"name_key": normalize_text(food["name"])}}))
+        if len(operations) == _BACKFILL_BATCH:
+            await db.foods.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await db.foods.bulk_write(operations, ordered=False)
+
+    last_food = await db.foods.find_one(sort=[("id", -1)], projection={"id": 1})
+    if last_food:
+        await db.counters.update_one({"_id": "foods"}, {"$max": {"seq": last_food["id"]}}, upsert=True)
+
+
+async def disambiguate_name_keys(db, docs: List[dict]):
+    """
+    Alimentos antiguos con el mismo name_key: el de menor id se queda la clave
+    y el resto pasa a "<clave> #<id>", que ningún nombre normalizado puede
+    producir. No se borra nada (las ingestas guardan el food_id); buscar el
+    nombre repetido lleva al alimento que conserva la clave.
+    """
+    keep, *rest = sorted(docs, key=lambda doc: doc.get("id", 0))
+    await db.foods.bulk_write([
+        UpdateOne({"_id": doc["_id"]}, {"$set": {"name_key": f"{doc['name_key']} #{doc.get('id', doc['_id'])}"}})
+        for doc in rest
+    ])
+
+
+async def allocate_food_ids(db, count: int = 1) -> List[int]:
+    """Reserva count ids consecutivos con una sola operación atómica."""
+    counter = await db.counters.find_one_and_update(
+        {"_id": "foods"},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    last_id = counter["seq"]
+    return list(range(last_id - count + 1, last_id + 1))
+
+
+async def register_foods(db, analysis_results: List[dict]):
+    """Guarda en el catálogo los alimentos analizados que aún no existen."""
+    new_by_key = {}
+    for result in analysis_results:
+        food_name = result.get("name", "Alimento Desconocido")
+        new_by_key.setdefault(normalize_text(food_name), (food_name, result))
+    if not new_by_key:
+        return
+
+    async for existing in db.foods.find({"name_key": {"$in": list(new_by_key)}}, {"name_key": 1}):
+        new_by_key.pop(existing["name_key"], None)
+    if not new_by_key:
+        return
+
+    new_ids = await allocate_food_ids(db, len(new_by_key))
+    new_foods = []
+    for food_id, (name_key, (food_name, result)) in zip(new_ids, new_by_key.items()):
+        new_foods.append({
+            "id": food_id,
+            "name": food_name,
+            "name_key": name_key,
+            "detail": f"1 porción • {result.get('calories')} Kcal",
+            "calories": result.get("calories"),
+            "protein": result.get("protein"),
+            "fat": result.get("fat")
+        })
+
+    # Si otro worker dio de alta el mismo plato entre la búsqueda y el upsert,
+    # el índice único lo detecta y ese alimento simplemente no se inserta
+    # (el id reservado queda sin usar, lo cual es inocuo).
+    operations = [
+        UpdateOne({"name_key": food["name_key"]}, {"$setOnInsert": food}, upsert=True)
+        for food in new_foods
+    ]
+    try:
+        upserted = (await db.foods.bulk_write(operations, ordered=False)).upserted_ids
+    except BulkWriteError as error:
+        if any(e["code"] != _DUPLICATE_KEY for e in error.details["writeErrors"]):
+            raise
+        upserted = {u["index"]: u["_id"] for u in error.details.get("upserted", [])}
+
+    for index in upserted:
+        food_search_index.add(new_foods[index])
+        meal_planner.add(new_foods[index])
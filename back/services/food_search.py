@@ -0,0 +1,281 @@
+"""
+Índice de búsqueda en memoria sobre el catálogo de alimentos.
+
+Sustituye al regex '.*q.*' sobre Mongo (que recorre toda la colección en cada
+tecla) por un índice invertido de n-gramas:
+- Normaliza nombres y consultas: sin tildes, en minúsculas ("platano" encuentra
+  "Plátano (1 mediano)").
+- Cada palabra aporta su prefijo ("^p", "^pl") y sus trigramas, de modo que
+  las consultas de 1-2 letras buscan por inicio de palabra y las de 3 o más
+  también encuentran coincidencias en mitad de palabra.
+- Los resultados se ordenan por relevancia y se paginan con offset/limit; la
+  búsqueda se detiene al llenar la página, así que su coste no depende de
+  cuántos alimentos coinciden en total.
+- Las listas de postings son arrays de numpy ordenados y se intersecan por
+  bloques con máscaras vectorizadas: una consulta sin resultados ("pollo zanahoria")
+  descarta los candidatos en C en lugar de comprobarlos uno a uno en Python.
+
+El índice se carga una vez en el arranque y después solo crece: vision.py
+añade los alimentos que crea y sync() recoge los que hayan insertado otros
+workers (ids mayores que el último indexado), sin reconstruirlo nunca.
+"""
+import asyncio
+import bisect
+import os
+import re
+import time
+import unicodedata
+from collections import defaultdict
+import numpy as np
+
+# Cada cuánto (segundos) se consultan alimentos nuevos insertados por otros workers
+SEARCH_SYNC_INTERVAL = float(os.getenv("FOOD_SEARCH_SYNC_INTERVAL", "5"))
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# Candidatos del primer bloque de la intersección; cada bloque siguiente dobla el tamaño
+_SCAN_FIRST_CHUNK = 256
+_SCAN_MAX_CHUNK = 65536
+_SCAN_GRAMS_PER_TOKEN = 2
+_EMPTY_POSTINGS = np.empty(0, dtype=np.int64)
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin tildes y solo letras/números separados por un espacio."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", without_accents.lower()).strip()
+
+
+def _token_grams(token: str):
+    marked = "^" + token
+    grams = {marked[:2]}
+    grams.update(marked[i:i + 3] for i in range(len(marked) - 2))
+    return grams
+
+
+def _query_grams(token: str):
+    # Consultas cortas: solo inicio de palabra. Largas: cualquier posición.
+    if len(token) <= 2:
+        return {"^" + token}
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class FoodSearchIndex:
+    """
+    Las listas de postings están ordenadas por id, así una búsqueda interseca
+    las listas de la consulta por bloques, empezando por la más corta, y se
+    detiene en cuanto llena la página, sin puntuar todas las coincidencias.
+    Orden de relevancia:
+      1. el nombre empieza por la consulta (orden alfabético, exacto primero)
+      2. todas las palabras de la consulta son inicio de palabra del nombre
+      3. el resto de coincidencias (trigramas en mitad de palabra)
+    Dentro de 2 y 3 manda el id, es decir, el orden del catálogo.
+    """
+
+    def __init__(self):
+        self._foods = {}                  # id -> {"id", "name", "detail"}
+        self._keys = {}                   # id -> nombre normalizado
+        self._grams = {}                  # n-grama -> array de ids ordenados
+        self._sorted_keys = []            # (nombre normalizado, id) para prefijos
+        self._sorted_ids = []             # para el listado sin consulta
+        self._max_id = 0
+        self._last_sync = 0.0
+        self._sync_lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._foods)
+
+    @property
+    def revision(self) -> str:
+        """Versión del catálogo indexado; igual en todos los workers sincronizados (solo crece)."""
+        return f"{len(self._foods)}-{self._max_id}"
+
+    def add(self, food: dict):
+        food_id = food["id"]
+        if food_id in self._foods:
+            self.remove(food_id)
+
+        key = self._store(food)
+        for gram in self._doc_grams(key):
+            ids = self._grams.get(gram, _EMPTY_POSTINGS)
+            self._grams[gram] = np.insert(ids, np.searchsorted(ids, food_id), food_id)
+        bisect.insort(self._sorted_keys, (key, food_id))
+        _insert_sorted(self._sorted_ids, food_id)
+
+    def add_many(self, foods):
+        """Alta masiva (carga inicial): ordena las estructuras una sola vez al final."""
+        new_grams = defaultdict(list)
+        for food in foods:
+            if food["id"] in self._foods:
+                self.remove(food["id"])
+            key = self._store(food)
+            for gram in self._doc_grams(key):
+                new_grams[gram].append(food["id"])
+            self._sorted_keys.append((key, food["id"]))
+            self._sorted_ids.append(food["id"])
+        for gram, ids in new_grams.items():
+            merged = np.concatenate((self._grams.get(gram, _EMPTY_POSTINGS), np.array(ids, dtype=np.int64)))
+            merged.sort()
+            self._grams[gram] = merged
+        self._sorted_keys.sort()
+        self._sorted_ids.sort()
+
+    def remove(self, food_id: int):
+        key = self._keys.pop(food_id, None)
+        if key is None:
+            return
+        del self._foods[food_id]
+        for gram in self._doc_grams(key):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids = ids[ids != food_id]
+                if ids.size:
+                    self._grams[gram] = ids
+                else:
+                    del self._grams[gram]
+        _remove_sorted(self._sorted_keys, (key, food_id))
+        _remove_sorted(self._sorted_ids, food_id)
+
+    def _store(self, food: dict) -> str:
+        food_id = food["id"]
+        key = normalize_text(food["name"])
+        self._foods[food_id] = {"id": food_id, "name": food["name"], "detail": food.get("detail", "")}
+        self._keys[food_id] = key
+        self._max_id = max(self._max_id, food_id)
+        return key
+
+    @staticmethod
+    def _doc_grams(key: str):
+        grams = set()
+        for token in key.split():
+            grams.update(_token_grams(token))
+        return grams
+
+    async def load(self, db):
+        """Carga inicial del catálogo completo (solo en el arranque)."""
+        cursor = db.foods.find({}, {"_id": 0, "id": 1, "name": 1, "detail": 1}).sort("id", 1)
+        self.add_many(await cursor.to_list(length=None))
+        self._last_sync = time.monotonic()
+
+    async def sync(self, db, force: bool = False):
+        """Incorpora los alimentos con id mayor que el último indexado."""
+        if not force and time.monotonic() - self._last_sync < SEARCH_SYNC_INTERVAL:
+            return
+        if self._sync_lock.locked():
+            return
+        async with self._sync_lock:
+            cursor = db.foods.find(
+                {"id": {"$gt": self._max_id}},
+                {"_id": 0, "id": 1, "name": 1, "detail": 1}
+            ).sort("id", 1)
+            async for food in cursor:
+                self.add(food)
+            self._last_sync = time.monotonic()
+
+    def search(self, query: str, limit: int = 50, offset: int = 0):
+        """Devuelve (resultados de la página, hay_más_resultados)."""
+        wanted = offset + limit + 1
+        normalized = normalize_text(query)
+        if not normalized:
+            page_ids = self._sorted_ids[offset:offset + limit + 1]
+            return [self._foods[i] for i in page_ids[:limit]], len(page_ids) > limit
+
+        tokens = normalized.split()
+        matched = []
+
+        # 1. Nombres que empiezan por la consulta: rango en la lista ordenada
+        position = bisect.bisect_left(self._sorted_keys, (normalized,))
+        while position < len(self._sorted_keys) and len(matched) < wanted:
+            key, food_id = self._sorted_keys[position]
+            if not key.startswith(normalized):
+                break
+            matched.append(food_id)
+            position += 1
+
+        # 2. Todas las palabras son inicio de palabra del nombre
+        if len(matched) < wanted:
+            for food_id in self._scan([_token_grams(t) for t in tokens]):
+                spaced = " " + self._keys[food_id]
+                if spaced.startswith(" " + normalized):
+                    continue
+                if all((" " + t) in spaced for t in tokens):
+                    matched.append(food_id)
+                    if len(matched) == wanted:
+                        break
+
+        # 3. Coincidencias en mitad de palabra (solo tokens de 3 o más letras)
+        if len(matched) < wanted and any(len(t) > 2 for t in tokens):
+            for food_id in self._scan([_query_grams(t) for t in tokens]):
+                key = self._keys[food_id]
+                spaced = " " + key
+                prefix_hits = [(" " + t) in spaced for t in tokens]
+                if all(prefix_hits):
+                    continue  # ya incluido en 1 o 2
+                if all(hit or (len(t) > 2 and t in key) for hit, t in zip(prefix_hits, tokens)):
+                    matched.append(food_id)
+                    if len(matched) == wanted:
+                        break
+
+        page = matched[offset:offset + limit]
+        return [self._foods[i] for i in page], len(matched) > offset + limit
+
+    def _scan(self, grams_per_token):
+        """
+        Candidatos, en orden, presentes en las listas de postings de cada token.
+        De cada token solo se usan sus _SCAN_GRAMS_PER_TOKEN n-gramas más raros:
+        es un filtro previo (search comprueba después cada nombre) y los
+        n-gramas de una misma palabra casi siempre descartan lo mismo.
+        Los candidatos salen de la lista más corta por bloques crecientes y se
+        filtran contra las demás con una máscara de ids; así una consulta que llena
+        la página pronto mira pocos ids y una sin resultados no pasa por Python.
+        """
+        selected = {}
+        for grams in grams_per_token:
+            postings = [(g, self._grams.get(g)) for g in grams]
+            if any(ids is None for _, ids in postings):
+                return
+            postings.sort(key=lambda item: len(item[1]))
+            selected.update(postings[:_SCAN_GRAMS_PER_TOKEN])
+        if not selected:
+            return
+        shortest, *others = sorted(selected.values(), key=len)
+        start, chunk = 0, _SCAN_FIRST_CHUNK
+        while start < len(shortest):
+            candidates = shortest[start:start + chunk]
+            for ids in others:
+                # Solo el tramo de la otra lista que cae en el rango del bloque
+                low, high = np.searchsorted(ids, (candidates[0], candidates[-1] + 1))
+                window = ids[low:high]
+                if not window.size:
+                    candidates = window
+                    break
+                # Pertenencia con una máscara sobre el rango de ids del bloque (sin búsquedas binarias)
+                base = candidates[0]
+                present = np.zeros(candidates[-1] - base + 1, dtype=bool)
+                present[window - base] = True
+                candidates = candidates[present[candidates - base]]
+                if not candidates.size:
+                    break
+            yield from candidates.tolist()
+            start += chunk
+            chunk = min(chunk * 2, _SCAN_MAX_CHUNK)
+
+
+def _insert_sorted(items: list, value):
+    if not items or items[-1] < value:
+        items.append(value)
+    else:
+        position = bisect.bisect_left(items, value)
+        if position == len(items) or items[position] != value:
+            items.insert(position, value)
+
+
+def _remove_sorted(items: list, value):
+    position = bisect.bisect_left(items, value)
+    if position < len(items) and items[position] == value:
+        items.pop(position)
+
+
+# Instancia compartida por todos los routers del worker
+food_search_index = FoodSearchIndex()
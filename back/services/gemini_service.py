@@ -1,19 +1,15 @@
 import os
-import google.generativeai as genai
 import json
+import threading
 from PIL import Image
 import io
+from services.image_preprocess import prepare_image, VISION_PREPROCESS
 
 # Cargar variables de entorno
 from dotenv import load_dotenv
 load_dotenv()
 
-# Configurar la API de Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("No se encontró la API Key de Gemini. Asegúrate de que está en el archivo .env")
-
-genai.configure(api_key=GEMINI_API_KEY)
 
 # Configuración del modelo
 generation_config = {
@@ -30,18 +26,38 @@ safety_settings = [
   {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
 ]
 
-model = genai.GenerativeModel(
-    model_name="gemini-robotics-er-1.5-preview",
-    generation_config=generation_config,
-    safety_settings=safety_settings
-)
+# El SDK de Gemini es pesado de importar: el modelo se crea en la primera
+# llamada, no al arrancar la API (ver services/vision_backend.py)
+model = None
+_model_lock = threading.Lock()
+
+def _get_model():
+    global model
+    with _model_lock:
+        if model is None:
+            if not GEMINI_API_KEY:
+                raise ValueError("No se encontró la API Key de Gemini. Asegúrate de que está en el archivo .env")
+
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            model = genai.GenerativeModel(
+                model_name="gemini-robotics-er-1.5-preview",
+                generation_config=generation_config,
+                safety_settings=safety_settings
+            )
+        return model
 
 def analyze_image_nutrition(image_bytes: bytes):
     """
     Analiza una imagen de comida usando Gemini y devuelve la información nutricional.
     """
     try:
-        image = Image.open(io.BytesIO(image_bytes))
+        if VISION_PREPROCESS:
+            # Imagen reducida y re-codificada: el envío es una fracción del original
+            data, mime_type = prepare_image(image_bytes)
+            image = {"mime_type": mime_type, "data": data}
+        else:
+            image = Image.open(io.BytesIO(image_bytes))
 
         prompt_parts = [
           "Eres un experto nutricionista y chef. Analiza la imagen proporcionada.",
@@ -61,7 +77,7 @@ def analyze_image_nutrition(image_bytes: bytes):
           image,
         ]
 
-        response = model.generate_content(prompt_parts)
+        response = _get_model().generate_content(prompt_parts)
         
         # Limpiar la respuesta para obtener solo el JSON
         cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
@@ -80,7 +96,7 @@ def analyze_image_nutrition(image_bytes: bytes):
         }
 
     except json.JSONDecodeError:
-        return {"is_food": False, "message": "Error al procesar la respuesta del modelo."}
+        return {"is_food": False, "error": True, "message": "Error al procesar la respuesta del modelo."}
     except Exception as e:
-        return {"is_food": False, "message": f"Ha ocurrido un error inesperado: {str(e)}"}
+        return {"is_food": False, "error": True, "message": f"Ha ocurrido un error inesperado: {str(e)}"}
 
@@ -0,0 +1,44 @@
+"""
+Pre-procesado de imágenes antes de enviarlas al modelo de visión.
+
+Las fotos de móvil llegan con 8-12 MB y resoluciones de 12 MP o más, mucho más
+de lo que el modelo necesita para reconocer un plato. prepare_image():
+1. Decodifica a tamaño reducido (modo draft de Pillow en JPEG: el decoder
+   escala a 1/2, 1/4 u 1/8 sin descomprimir la imagen completa).
+2. Aplica la orientación EXIF, para que el modelo no reciba fotos giradas.
+3. Reduce hasta VISION_MAX_EDGE píxeles en el lado mayor.
+4. Re-codifica en JPEG con calidad VISION_JPEG_QUALITY.
+"""
+import io
+import os
+from PIL import Image, ImageOps
+
+VISION_PREPROCESS = os.getenv("VISION_PREPROCESS", "true").lower() == "true"
+VISION_MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "1024"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+_EXIF_ORIENTATION = 0x0112
+
+
+def prepare_image(image_bytes: bytes, max_edge: int = VISION_MAX_EDGE, quality: int = VISION_JPEG_QUALITY):
+    """Devuelve (bytes JPEG listos para el modelo, mime_type)."""
+    image = Image.open(io.BytesIO(image_bytes))
+    original_format = image.format
+    original_size = image.size
+    orientation = image.getexif().get(_EXIF_ORIENTATION, 1)
+
+    # Una imagen que ya es pequeña y está bien orientada se envía tal cual
+    if (original_format == "JPEG" and max(original_size) <= max_edge and orientation == 1):
+        return image_bytes, "image/jpeg"
+
+    if original_format == "JPEG":
+        image.draft("RGB", (max_edge, max_edge))
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue(), "image/jpeg"
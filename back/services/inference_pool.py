@@ -0,0 +1,122 @@
+"""
+Pool acotado para las llamadas de inferencia de visión.
+
+analyze_image_nutrition es bloqueante (decodificación con Pillow + llamada a
+Gemini), así que se ejecuta en un ThreadPoolExecutor dedicado y nunca en el
+event loop. Además:
+- Como mucho VISION_MAX_CONCURRENCY llamadas al modelo a la vez.
+- Como mucho VISION_MAX_QUEUE peticiones esperando turno; a partir de ahí se
+  rechaza con InferencePoolFull (el router responde 503 + Retry-After) en vez
+  de acumular imágenes en memoria.
+- Cada llamada tiene un timeout de VISION_TIMEOUT_SECONDS. El hueco del pool
+  no se libera hasta que el hilo termina de verdad, para que los timeouts no
+  permitan superar el límite de concurrencia.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+VISION_MAX_CONCURRENCY = int(os.getenv("VISION_MAX_CONCURRENCY", "4"))
+VISION_MAX_QUEUE = int(os.getenv("VISION_MAX_QUEUE", "16"))
+VISION_TIMEOUT_SECONDS = float(os.getenv("VISION_TIMEOUT_SECONDS", "30"))
+VISION_RETRY_AFTER_SECONDS = int(os.getenv("VISION_RETRY_AFTER_SECONDS", "5"))
+
+
+class InferencePoolFull(Exception):
+    pass
+
+
+class InferenceTimeout(Exception):
+    pass
+
+
+class _Timing:
+    """Contador, suma y máximo de una medida en segundos (se observa desde varios hilos)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        avg = self.total / self.count if self.count else 0.0
+        return {"count": self.count, "avg_ms": round(avg * 1000, 1), "max_ms": round(self.max * 1000, 1)}
+
+
+class InferencePool:
+    def __init__(self, max_concurrency: int = VISION_MAX_CONCURRENCY, max_queue: int = VISION_MAX_QUEUE,
+                 timeout: float = VISION_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="vision")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._running = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_time = _Timing()
+        self.model_latency = _Timing()
+
+    async def run(self, fn, *args):
+        if self._waiting >= self.max_queue:
+            self.rejected += 1
+            raise InferencePoolFull()
+
+        self._waiting += 1
+        queued_at = time.monotonic()
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self.wait_time.observe(time.monotonic() - queued_at)
+
+        self._running += 1
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._timed_call, fn, args)
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise InferenceTimeout()
+
+    def _timed_call(self, fn, args):
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            self.model_latency.observe(time.monotonic() - started)
+
+    def _release(self, future):
+        self._running -= 1
+        self._slots.release()
+        if not future.cancelled():
+            future.exception()  # evita el aviso de excepción no recuperada tras un timeout
+
+    def stats(self):
+        return {
+            "in_flight": self._running,
+            "queue_depth": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_time": self.wait_time.as_dict(),
+            "model_latency": self.model_latency.as_dict(),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Instancia compartida por el worker
+inference_pool = InferencePool()
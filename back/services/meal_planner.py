@@ -0,0 +1,294 @@
+"""
+Generador de planes de comida a partir del catálogo de alimentos.
+
+Sustituye a las dos listas fijas de routers/plan.py por un plan calculado para
+cada perfil: reparte caloriesTarget entre las comidas del día, intenta cuadrar
+los macros del perfil (o el reparto típico de su objetivo) y excluye los
+alimentos que contienen sus alergias.
+
+- El catálogo vive en memoria como una matriz numpy (calorías, proteína,
+  carbohidratos, grasa por porción) más una matriz booleana de alérgenos; el
+  solver evalúa todos los alimentos candidatos de una vez en cada paso.
+- La matriz se carga en el arranque y solo crece: food_catalog.register_foods
+  añade los alimentos que crea y sync() recoge los de otros workers.
+- Los planes se memorizan por (calorías redondeadas, macros redondeados,
+  objetivo, alergias); cada alta en el catálogo sube la versión de la matriz
+  y los planes calculados con la versión anterior se recalculan al pedirse.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+from services.food_search import normalize_text
+
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1024"))
+PLAN_CALORIE_BUCKET = int(os.getenv("PLAN_CALORIE_BUCKET", "50"))
+PLAN_SYNC_INTERVAL = float(os.getenv("PLAN_SYNC_INTERVAL", "30"))
+
+# Comidas del día: (tipo, fracción de las calorías, alimentos por comida)
+SLOTS = (
+    ("Desayuno", 0.25, 2),
+    ("Almuerzo", 0.35, 2),
+    ("Snack", 0.10, 1),
+    ("Cena", 0.30, 2),
+)
+
+# Porciones posibles de cada alimento del catálogo (en raciones del catálogo)
+MIN_SERVINGS = 0.5
+MAX_SERVINGS = 3.0
+
+# Reparto de calorías entre proteína, carbohidratos y grasa si el perfil no trae macros
+GOAL_MACRO_SPLIT = {
+    "Perder peso": (0.30, 0.40, 0.30),
+    "Ganar músculo": (0.30, 0.45, 0.25),
+}
+DEFAULT_MACRO_SPLIT = (0.25, 0.50, 0.25)
+KCAL_PER_GRAM = np.array([4.0, 4.0, 9.0])
+
+# Peso de la desviación en calorías frente a la de cada macro en el solver
+KCAL_ERROR_WEIGHT = 2.0
+
+# El catálogo no trae alérgenos: se deducen del nombre normalizado. Los
+# alimentos que tengan un campo "allergens" lo suman a lo deducido.
+ALLERGEN_KEYWORDS = {
+    "lactosa": ("leche", "yogur", "queso", "whey", "kefir", "nata", "helado", "lacteo", "requeson"),
+    "gluten": ("pan", "pasta", "avena", "trigo", "cebada", "centeno", "galleta", "cuscus"),
+    "frutos secos": ("almendra", "nuez", "nueces", "mani", "cacahuete", "pistacho", "anacardo", "avellana"),
+    "huevo": ("huevo",),
+    "pescado": ("salmon", "atun", "merluza", "sardina", "bacalao", "trucha"),
+    "marisco": ("gamba", "camaron", "langostino", "mejillon", "calamar", "pulpo"),
+    "soja": ("soja", "tofu", "edamame"),
+}
+_ALLERGENS = tuple(ALLERGEN_KEYWORDS)
+
+_COLUMNS = ("calories", "protein", "carbs", "fat")
+
+
+def _has_word(name_key: str, keyword: str) -> bool:
+    # Inicio de palabra: "pan" marca "pan integral" pero no "papa" ni "espinaca"
+    return (" " + name_key).find(" " + keyword) != -1
+
+
+def _food_allergens(food: dict, name_key: str):
+    declared = {normalize_text(a) for a in food.get("allergens") or ()}
+    return [
+        allergen in declared or any(_has_word(name_key, k) for k in ALLERGEN_KEYWORDS[allergen])
+        for allergen in _ALLERGENS
+    ]
+
+
+class NutrientMatrix:
+    """Catálogo en arrays numpy, con capacidad que se duplica al crecer."""
+
+    def __init__(self, capacity: int = 256):
+        self.values = np.zeros((capacity, len(_COLUMNS)))
+        self.allergens = np.zeros((capacity, len(_ALLERGENS)), dtype=bool)
+        self.ids = []
+        self.names = []
+        self.keys = []
+        self._row_by_id = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, food: dict):
+        row = self._row_by_id.get(food["id"])
+        if row is None:
+            row = len(self.ids)
+            if row == self.values.shape[0]:
+                self._grow()
+            self._row_by_id[food["id"]] = row
+            self.ids.append(food["id"])
+            self.names.append(food["name"])
+            self.keys.append("")
+        name_key = food.get("name_key") or normalize_text(food["name"])
+        self.names[row] = food["name"]
+        self.keys[row] = name_key
+        self.values[row] = [food.get(column) or 0 for column in _COLUMNS]
+        self.allergens[row] = _food_allergens(food, name_key)
+        self.version += 1
+
+    def _grow(self):
+        self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+        self.allergens = np.concatenate([self.allergens, np.zeros_like(self.allergens)])
+
+    def excluded(self, allergies) -> np.ndarray:
+        """Máscara de alimentos que contienen alguna de las alergias (ya normalizadas)."""
+        size = len(self.ids)
+        mask = np.zeros(size, dtype=bool)
+        for allergy in allergies:
+            if allergy in ALLERGEN_KEYWORDS:
+                mask |= self.allergens[:size, _ALLERGENS.index(allergy)]
+            else:
+                # Alergia no contemplada ("fresa"): se busca en el nombre
+                mask |= np.fromiter((_has_word(key, allergy) for key in self.keys), dtype=bool, count=size)
+        return mask
+
+
+def _format_servings(servings: float) -> str:
+    return f"{servings:g}"
+
+
+def solve_day(matrix: NutrientMatrix, kcal_target: float, macro_target: np.ndarray, excluded: np.ndarray) -> Optional[List[dict]]:
+    """
+    Solver voraz: para cada comida elige uno a uno los alimentos y su porción
+    (en medias raciones) que dejan los macros acumulados de la comida más
+    cerca de su parte del objetivo. Cada alimento se usa una sola vez al día.
+    Devuelve None si no hay alimentos utilizables.
+    """
+    size = len(matrix)
+    values = matrix.values[:size]
+    candidates = np.flatnonzero(~excluded & (values[:, 0] > 0))
+    if candidates.size == 0:
+        return None
+
+    food_values = values[candidates]
+    inverse_kcal = 1.0 / food_values[:, 0]
+    used = np.zeros(candidates.size, dtype=bool)
+
+    meals = []
+    day_totals = np.zeros(len(_COLUMNS))
+    remaining_share = sum(share for _, share, _ in SLOTS)
+    for meal_type, share, foods_per_meal in SLOTS:
+        # Lo que faltó (o sobró) en las comidas anteriores se reparte en las siguientes
+        fraction = share / remaining_share
+        remaining_share -= share
+        slot_kcal = max(kcal_target - day_totals[0], 1.0) * fraction
+        slot_macros = np.maximum((macro_target - day_totals[1:]) * fraction, 1.0)
+        # Error relativo al objetivo de la comida; las calorías pesan el doble
+        scale = np.concatenate(([slot_kcal / np.sqrt(KCAL_ERROR_WEIGHT)], slot_macros))
+        scaled_values = food_values / scale
+        totals = np.zeros(len(_COLUMNS))
+        picks = []
+        for step in range(foods_per_meal):
+            wanted_kcal = (slot_kcal - totals[0]) / (foods_per_meal - step)
+            servings = np.clip(np.round(wanted_kcal * inverse_kcal * 2) / 2, MIN_SERVINGS, MAX_SERVINGS)
+            progress = (totals[0] + wanted_kcal) / slot_kcal
+            goal = np.concatenate(([totals[0] + wanted_kcal], slot_macros * progress))
+            deviation = servings[:, None] * scaled_values + (totals - goal) / scale
+            error = np.einsum("ij,ij->i", deviation, deviation)
+            error[used] = np.inf
+            best = int(np.argmin(error))
+            if not np.isfinite(error[best]):
+                break
+            used[best] = True
+            totals = totals + servings[best] * food_values[best]
+            picks.append((int(candidates[best]), float(servings[best])))
+
+        if not picks:
+            continue
+        day_totals += totals
+        foods = [
+            {
+                "id": matrix.ids[row],
+                "name": matrix.names[row],
+                "servings": servings,
+                "kcal": int(round(values[row, 0] * servings)),
+            }
+            for row, servings in picks
+        ]
+        meals.append({
+            "type": meal_type,
+            "name": " + ".join(
+                food["name"] if food["servings"] == 1 else f"{_format_servings(food['servings'])} × {food['name']}"
+                for food in foods
+            ),
+            "kcal": int(round(totals[0])),
+            "macros": f"{round(totals[1])}P • {round(totals[2])}C • {round(totals[3])}G",
+            "foods": foods,
+        })
+    return meals or None
+
+
+class MealPlanner:
+    def __init__(self, max_entries: int = PLAN_CACHE_MAX_ENTRIES):
+        self.matrix = NutrientMatrix()
+        self.max_entries = max_entries
+        self._plans = OrderedDict()   # clave de perfil -> (versión de la matriz, comidas)
+        self._max_id = 0
+        self._last_sync = 0.0
+        self._sync_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, food: dict):
+        self.matrix.add(food)
+        self._max_id = max(self._max_id, food["id"])
+
+    async def load(self, db):
+        """Carga inicial del catálogo completo (solo en el arranque)."""
+        async for food in db.foods.find({}, _FOOD_PROJECTION).sort("id", 1):
+            self.add(food)
+        self._last_sync = time.monotonic()
+
+    async def sync(self, db, force: bool = False):
+        """Incorpora los alimentos con id mayor que el último cargado."""
+        if not force and time.monotonic() - self._last_sync < PLAN_SYNC_INTERVAL:
+            return
+        if self._sync_lock.locked():
+            return
+        async with self._sync_lock:
+            async for food in db.foods.find({"id": {"$gt": self._max_id}}, _FOOD_PROJECTION).sort("id", 1):
+                self.add(food)
+            self._last_sync = time.monotonic()
+
+    def plan_for(self, profile: dict) -> Optional[List[dict]]:
+        """Plan del día para el perfil, o None si el catálogo no da para uno."""
+        profile = profile or {}
+        kcal_target = _bucket(profile.get("caloriesTarget") or 2000, PLAN_CALORIE_BUCKET)
+        goal = profile.get("goal") or ""
+        macro_target = _macro_target(profile.get("macros"), goal, kcal_target)
+        allergies = frozenset(filter(None, (normalize_text(a) for a in profile.get("allergies") or ())))
+        key = (kcal_target, tuple(macro_target), goal, allergies)
+
+        cached = self._plans.get(key)
+        if cached is not None and cached[0] == self.matrix.version:
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        meals = solve_day(self.matrix, kcal_target, np.array(macro_target, dtype=float), self.matrix.excluded(allergies))
+        self._plans[key] = (self.matrix.version, meals)
+        self._plans.move_to_end(key)
+        while len(self._plans) > self.max_entries:
+            self._plans.popitem(last=False)
+        return meals
+
+    @property
+    def catalog_revision(self) -> str:
+        """Como FoodSearchIndex.revision: igual en todos los workers sincronizados."""
+        return f"{len(self.matrix)}-{self._max_id}"
+
+    def stats(self):
+        return {
+            "foods": len(self.matrix),
+            "catalog_version": self.matrix.version,
+            "cached_plans": len(self._plans),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_FOOD_PROJECTION = {"_id": 0, "id": 1, "name": 1, "name_key": 1, "allergens": 1, **{c: 1 for c in _COLUMNS}}
+
+
+def _bucket(value: float, size: int) -> int:
+    return int(round(float(value) / size) * size) or size
+
+
+def _macro_target(macros: Optional[dict], goal: str, kcal_target: int):
+    """Gramos de (proteína, carbohidratos, grasa), redondeados a 5 g."""
+    if macros and all(macros.get(m) for m in ("protein", "carbs", "fat")):
+        grams = [macros["protein"], macros["carbs"], macros["fat"]]
+    else:
+        split = np.array(GOAL_MACRO_SPLIT.get(goal, DEFAULT_MACRO_SPLIT))
+        grams = kcal_target * split / KCAL_PER_GRAM
+    return [_bucket(g, 5) for g in grams]
+
+
+# Instancia compartida por el worker
+meal_planner = MealPlanner()
@@ -0,0 +1,253 @@
+"""
+Métricas de Prometheus del worker (se exponen en GET /metrics).
+
+- Peticiones HTTP: duración por método, ruta (la plantilla, p. ej.
+  "/api/v1/history/days", no la URL concreta) y código de respuesta, más las
+  que están en curso. Los streams SSE solo cuentan al terminar, sin duración.
+- Mongo: un CommandListener de pymongo mide cada comando por colección y
+  tipo (find, aggregate, update...) y cuenta los documentos devueltos o
+  escritos, así se ve qué consulta se come el tiempo de cada ruta. Un
+  ConnectionPoolListener mide cuánto se espera a una conexión libre del pool
+  y cuántas hay abiertas y en uso, para dimensionar MONGO_MAX_POOL_SIZE.
+- Visión: duración de cada llamada a analyze_image_nutrition por backend y
+  resultado.
+- Estado de los componentes en memoria (pool de inferencia, cachés,
+  planificador, conexiones SSE): se lee de sus stats() al hacer scrape.
+"""
+import time
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from pymongo import monitoring
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Peticiones HTTP en curso")
+HTTP_STREAMS = Counter("http_streams_total", "Respuestas en streaming (SSE) terminadas", ("route", "status"))
+
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "Duración de los comandos de Mongo", ("command", "collection"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+MONGO_COMMAND_DOCUMENTS = Counter(
+    "mongo_command_documents_total", "Documentos devueltos (lecturas) o afectados (escrituras)",
+    ("command", "collection"),
+)
+MONGO_COMMAND_FAILURES = Counter("mongo_command_failures_total", "Comandos de Mongo fallidos", ("command", "collection"))
+
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Espera hasta obtener una conexión del pool", ("address",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Conexiones que no se pudieron obtener del pool", ("address", "reason")
+)
+MONGO_POOL_CONNECTIONS = Gauge("mongo_pool_connections", "Conexiones abiertas en el pool", ("address",))
+MONGO_POOL_CONNECTIONS_IN_USE = Gauge("mongo_pool_connections_in_use", "Conexiones prestadas del pool", ("address",))
+
+VISION_INFERENCE_DURATION = Histogram(
+    "vision_inference_duration_seconds", "Duración de analyze_image_nutrition", ("backend", "outcome"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0),
+)
+
+# Comandos internos del driver (handshake, latidos, sesiones) que no interesan
+_IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+
+class MetricsMiddleware:
+    """Middleware ASGI (sin BaseHTTPMiddleware, que envolvería las respuestas en streaming)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = "500"
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                headers = dict(message.get("headers") or ())
+                streaming = headers.get(b"content-type", b"").startswith(b"text/event-stream")
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # El router deja la ruta encontrada en el scope; sin ella se agrupa todo para no disparar etiquetas
+            route = getattr(scope.get("route"), "path", "unmatched")
+            if streaming:
+                HTTP_STREAMS.labels(route, status).inc()
+            else:
+                HTTP_REQUEST_DURATION.labels(scope["method"], route, status).observe(time.perf_counter() - started)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Tiempo y documentos por comando y colección (se llama desde los hilos del driver)."""
+
+    def __init__(self):
+        self._pending = {}   # (conexión, request_id) -> (comando, colección)
+
+    def started(self, event):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        self._pending[(event.connection_id, event.request_id)] = (event.command_name, _collection(event))
+
+    def succeeded(self, event):
+        labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels is None:
+            return
+        MONGO_COMMAND_DURATION.labels(*labels).observe(event.duration_micros / 1e6)
+        documents = _documents(event.command_name, event.reply)
+        if documents:
+            MONGO_COMMAND_DOCUMENTS.labels(*labels).inc(documents)
+
+    def failed(self, event):
+        labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels is None:
+            return
+        MONGO_COMMAND_DURATION.labels(*labels).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(*labels).inc()
+
+
+def _collection(event) -> str:
+    if event.command_name == "getMore":
+        return event.command.get("collection", "")
+    target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else ""
+
+
+def _documents(command_name: str, reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") is not None else 0
+    n = reply.get("n", 0)
+    return n if isinstance(n, int) else 0
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Esperas y ocupación del pool de conexiones de cada servidor."""
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        address = _address(event)
+        MONGO_POOL_CONNECTIONS_IN_USE.labels(address).inc()
+        if event.duration is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(address).observe(event.duration)
+
+    def connection_check_out_failed(self, event):
+        address = _address(event)
+        MONGO_POOL_CHECKOUT_FAILURES.labels(address, event.reason).inc()
+        if event.duration is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(address).observe(event.duration)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS_IN_USE.labels(_address(event)).dec()
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event)).inc()
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event)).dec()
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+mongo_pool_listener = MongoPoolListener()
+
+
+def observe_inference(backend: str, fn, image_bytes: bytes):
+    """Llama al backend de visión midiendo cuánto tarda y qué devuelve."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = fn(image_bytes)
+        outcome = "error" if result.get("error") else ("food" if result.get("is_food") else "not_food")
+        return result
+    finally:
+        VISION_INFERENCE_DURATION.labels(backend, outcome).observe(time.perf_counter() - started)
+
+
+class ComponentStatsCollector:
+    """Publica en cada scrape los stats() de los componentes en memoria del worker."""
+
+    def collect(self):
+        # Imports perezosos: config/database.py importa este módulo antes de que existan
+        from services.inference_pool import inference_pool
+        from services.analysis_cache import analysis_cache
+        from services.profile_cache import profile_cache
+        from services.meal_planner import meal_planner
+        from services.security import token_verifier
+        from services.notifications import notification_hub
+
+        pool = inference_pool.stats()
+        yield _gauge("vision_pool_in_flight", "Inferencias ejecutándose", pool["in_flight"])
+        yield _gauge("vision_pool_queue_depth", "Inferencias esperando turno", pool["queue_depth"])
+        yield _counter("vision_pool_rejected", "Inferencias rechazadas por cola llena", pool["rejected"])
+        yield _counter("vision_pool_timeouts", "Inferencias que superaron el timeout", pool["timeouts"])
+
+        planner = meal_planner.stats()
+        caches = {
+            "analysis": analysis_cache.stats(),
+            "profile": profile_cache.stats(),
+            "meal_plan": {"entries": planner["cached_plans"], "hits": planner["hits"], "misses": planner["misses"]},
+            "token": token_verifier.stats(),
+        }
+        entries = GaugeMetricFamily("cache_entries", "Entradas en las cachés en memoria", labels=("cache",))
+        hits = CounterMetricFamily("cache_hits", "Aciertos de las cachés en memoria", labels=("cache",))
+        misses = CounterMetricFamily("cache_misses", "Fallos de las cachés en memoria", labels=("cache",))
+        for name, stats in caches.items():
+            entries.add_metric((name,), stats["entries"])
+            hits.add_metric((name,), stats["hits"])
+            misses.add_metric((name,), stats["misses"])
+        yield from (entries, hits, misses)
+
+        yield _gauge("meal_planner_foods", "Alimentos en la matriz del planificador", planner["foods"])
+        yield _gauge("notification_streams", "Conexiones SSE abiertas", notification_hub.connections())
+
+
+def _gauge(name, documentation, value):
+    family = GaugeMetricFamily(name, documentation)
+    family.add_metric((), value)
+    return family
+
+
+def _counter(name, documentation, value):
+    family = CounterMetricFamily(name, documentation)
+    family.add_metric((), value)
+    return family
+
+
+REGISTRY.register(ComponentStatsCollector())
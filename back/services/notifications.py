@@ -0,0 +1,142 @@
+"""
+Notificaciones: altas, contador de no leídas y entrega en tiempo real.
+
+- Los ids salen de un contador en "counters" (como los de alimentos) y crecen
+  con el tiempo, así que sirven de cursor para paginar del más nuevo al más
+  antiguo con el índice (user_email, id).
+- "unread_counts" guarda un documento por usuario con sus no leídas; se
+  actualiza con $inc al crear y al marcar como leídas, de modo que el badge
+  es una lectura por _id y no un count sobre la colección.
+- Cada alta o cambio del contador se publica en el bus de eventos; cada worker
+  lo entrega a las conexiones SSE (/notifications/stream) de ese usuario que
+  tenga abiertas, a través de una cola en memoria por conexión.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional
+from pymongo import ReturnDocument, UpdateOne
+from services.event_bus import event_bus
+
+NOTIFICATIONS_QUEUE_SIZE = int(os.getenv("NOTIFICATIONS_QUEUE_SIZE", "100"))
+
+TOPIC = "notifications"
+
+NOTIFICATION_PROJECTION = {"_id": 0, "id": 1, "type": 1, "title": 1, "time": 1, "description": 1, "isRead": 1}
+
+
+async def bootstrap_notifications(db):
+    """
+    Se ejecuta en el arranque: alinea el contador de ids con el máximo
+    existente y, si aún no hay contadores de no leídas (primera vez o base
+    recién sembrada), los calcula a partir de las notificaciones existentes.
+    """
+    last = await db.notifications.find_one(sort=[("id", -1)], projection={"id": 1})
+    if last:
+        await db.counters.update_one({"_id": "notifications"}, {"$max": {"seq": last["id"]}}, upsert=True)
+
+    if await db.unread_counts.estimated_document_count():
+        return
+    pipeline = [
+        {"$match": {"isRead": False}},
+        {"$group": {"_id": "$user_email", "unread": {"$sum": 1}}},
+    ]
+    operations = [
+        UpdateOne({"_id": row["_id"]}, {"$setOnInsert": {"unread": row["unread"]}}, upsert=True)
+        async for row in db.notifications.aggregate(pipeline)
+    ]
+    if operations:
+        await db.unread_counts.bulk_write(operations, ordered=False)
+
+
+async def unread_count(db, user_email: str) -> int:
+    counter = await db.unread_counts.find_one({"_id": user_email})
+    return counter["unread"] if counter else 0
+
+
+async def create_notification(db, user_email: str, type: str, title: str, description: str) -> dict:
+    """Guarda una notificación no leída y la envía a las conexiones abiertas del usuario."""
+    sequence = await db.counters.find_one_and_update(
+        {"_id": "notifications"},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    now = datetime.now()
+    notification = {
+        "id": sequence["seq"],
+        "type": type,
+        "title": title,
+        "time": now.strftime("%H:%M"),
+        "description": description,
+        "isRead": False,
+    }
+    await db.notifications.insert_one({**notification, "user_email": user_email, "created_at": now})
+    unread = await _add_unread(db, user_email, 1)
+    await event_bus.publish(db, TOPIC, {
+        "user_email": user_email,
+        "event": "notification",
+        "data": {**notification, "unread": unread},
+    })
+    return notification
+
+
+async def mark_as_read(db, user_email: str, ids: Optional[List[int]] = None) -> int:
+    """Marca como leídas las notificaciones indicadas (o todas). Devuelve las no leídas restantes."""
+    query = {"user_email": user_email, "isRead": False}
+    if ids is not None:
+        query["id"] = {"$in": ids}
+    result = await db.notifications.update_many(query, {"$set": {"isRead": True}})
+    if not result.modified_count:
+        return await unread_count(db, user_email)
+
+    unread = await _add_unread(db, user_email, -result.modified_count)
+    await event_bus.publish(db, TOPIC, {"user_email": user_email, "event": "unread", "data": {"unread": unread}})
+    return unread
+
+
+async def _add_unread(db, user_email: str, delta: int) -> int:
+    counter = await db.unread_counts.find_one_and_update(
+        {"_id": user_email},
+        {"$inc": {"unread": delta}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["unread"]
+
+
+class NotificationHub:
+    """Conexiones SSE abiertas en este worker, por usuario."""
+
+    def __init__(self, queue_size: int = NOTIFICATIONS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._queues = defaultdict(set)
+
+    def connect(self, user_email: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues[user_email].add(queue)
+        return queue
+
+    def disconnect(self, user_email: str, queue: asyncio.Queue):
+        queues = self._queues.get(user_email)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[user_email]
+
+    def connections(self) -> int:
+        return sum(len(queues) for queues in self._queues.values())
+
+    def deliver(self, payload: dict):
+        for queue in self._queues.get(payload["user_email"], ()):
+            try:
+                queue.put_nowait((payload["event"], payload["data"]))
+            except asyncio.QueueFull:
+                pass  # cliente que no lee: pierde eventos, el contador se corrige en el siguiente
+
+
+# Instancia compartida por el worker
+notification_hub = NotificationHub()
+
+event_bus.subscribe(TOPIC, notification_hub.deliver)
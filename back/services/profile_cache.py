@@ -0,0 +1,91 @@
+"""
+Caché de perfiles por usuario.
+
+Dashboard, plan, /food/log y /profile leen el mismo documento de "profiles"
+varias veces por segundo al abrir la app. La caché:
+- guarda cada perfil (o su ausencia) hasta PROFILE_CACHE_TTL_SECONDS,
+- con como mucho PROFILE_CACHE_MAX_ENTRIES usuarios (LRU),
+- se actualiza al escribir (write-through desde profile.create_or_update_profile)
+  y avisa al resto de workers por el bus de eventos para que descarten su copia.
+
+Los perfiles devueltos se comparten entre peticiones: no se deben modificar.
+Una lectura de Mongo que termina después de una escritura o invalidación del
+mismo usuario no se guarda: traería el documento anterior.
+"""
+import os
+import time
+from collections import OrderedDict
+from services.event_bus import event_bus
+
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+
+INVALIDATE_TOPIC = "profile.invalidate"
+
+
+class ProfileCache:
+    def __init__(self, ttl_seconds: float = PROFILE_CACHE_TTL_SECONDS, max_entries: int = PROFILE_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # email -> (perfil o None, caduca_en)
+        self._reads = {}                # email -> generación de la lectura de Mongo en curso
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, db, user_email: str):
+        entry = self._entries.get(user_email)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(user_email)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        self._generation += 1
+        generation = self._reads[user_email] = self._generation
+        try:
+            profile = await db.profiles.find_one({"user_email": user_email}, {"_id": 0})
+        finally:
+            current = self._reads.get(user_email)
+            if current == generation:
+                del self._reads[user_email]
+        # Si entretanto hubo una escritura o invalidación (o empezó otra lectura), no se guarda
+        if current == generation:
+            self._store(user_email, profile)
+        return profile
+
+    async def write_through(self, db, user_email: str, profile: dict):
+        """Avisa a los workers (incluido este) y guarda el perfil recién escrito."""
+        self._reads.pop(user_email, None)
+        self._store(user_email, profile)
+        await event_bus.publish(db, INVALIDATE_TOPIC, {"user_email": user_email})
+
+    def invalidate(self, user_email: str):
+        self._reads.pop(user_email, None)
+        if self._entries.pop(user_email, None) is not None:
+            self.invalidations += 1
+
+    def _store(self, user_email: str, profile):
+        self._entries[user_email] = (profile, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(user_email)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+# Instancia compartida por el worker
+profile_cache = ProfileCache()
+
+
+def _on_invalidate(payload: dict):
+    profile_cache.invalidate(payload["user_email"])
+
+event_bus.subscribe(INVALIDATE_TOPIC, _on_invalidate)
@@ -0,0 +1,215 @@
+"""
+Perfilado opcional de peticiones sueltas, en formato de flamegraph.
+
+Desactivado por defecto (PROFILING_ENABLED). Con él activo se perfila una
+petición si:
+- trae la cabecera X-Profile con el valor de PROFILING_TOKEN (sin token
+  configurado la cabecera se ignora: cualquiera podría pedir perfiles), o
+- le toca por muestreo (PROFILING_SAMPLE_RATE, p. ej. 0.01 = 1 de cada 100).
+
+Mientras dura la petición, un hilo muestrea cada PROFILING_INTERVAL_MS:
+- la pila de la tarea asyncio de la petición: si está ejecutando, la del event
+  loop; si está esperando, su cadena de awaits hasta la espera (una consulta
+  de Motor, el pool de inferencia...), así el tiempo bloqueado en Mongo o en
+  Gemini aparece debajo de la función que lo espera;
+- la pila de los hilos de los pools (Motor/pymongo, visión, hash de
+  contraseñas) que están trabajando, colgada de "[hilo <nombre>]". Estos no
+  se pueden atribuir a una petición concreta: con varias en vuelo se mezclan.
+
+El resultado son pilas colapsadas ("a;b;c <muestras>", una por línea), que
+leen flamegraph.pl, speedscope o inferno. Se escriben en
+PROFILING_OUTPUT_DIR (la respuesta lleva el nombre en X-Profile-File; se
+conservan los PROFILING_MAX_FILES más recientes) o, con
+"X-Profile-Output: inline", sustituyen al cuerpo de la respuesta. Solo se
+perfila una petición a la vez por worker; no es para streams SSE.
+"""
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", "30"))
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+
+_PROFILE_SUFFIX = ".folded"
+
+_EXECUTOR_WORKER = os.path.join("concurrent", "futures", "thread.py")
+
+
+class StackSampler(threading.Thread):
+    """Muestrea la pila de una tarea asyncio y de los hilos de los pools hasta stop()."""
+
+    def __init__(self, task: asyncio.Task, loop_thread_id: int, interval: float, max_seconds: float):
+        super().__init__(name="profiler", daemon=True)
+        self.task = task
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.deadline = time.monotonic() + max_seconds
+        self.samples = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval) and time.monotonic() < self.deadline:
+            self.sample()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def sample(self):
+        frames = sys._current_frames()
+        stack = self._task_stack(frames.get(self.loop_thread_id))
+        if stack:
+            self.samples[";".join(stack)] += 1
+
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident in (self.loop_thread_id, self.ident):
+                continue
+            stack = _busy_worker_stack(frame)
+            if stack:
+                pool = re.sub(r"[_-]?\d+$", "", names.get(ident, "?"))
+                self.samples[";".join([f"[hilo {pool}]", *stack])] += 1
+
+    def _task_stack(self, loop_frame):
+        coro = self.task.get_coro()
+        root = getattr(coro, "cr_frame", None)
+        if root is None:
+            return None   # la tarea ya terminó
+
+        # ¿Es la tarea la que está ejecutando ahora en el event loop?
+        running = []
+        frame = loop_frame
+        while frame is not None:
+            running.append(frame)
+            if frame is root:
+                return [_label(f) for f in reversed(running)]
+            frame = frame.f_back
+
+        # Está suspendida: se sigue la cadena de awaits hasta lo que espera
+        stack = []
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is None:
+                break
+            stack.append(_label(frame))
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        waited = type(coro).__name__.replace("FutureIter", "Future") if coro is not None else "?"
+        return [*stack, f"[esperando {waited}]"]
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _busy_worker_stack(frame):
+    """Pila (raíz primero) de un hilo de ThreadPoolExecutor que está ejecutando algo, o None."""
+    frames = []
+    while frame is not None:
+        if frame.f_code.co_name == "_worker" and frame.f_code.co_filename.endswith(_EXECUTOR_WORKER):
+            # Justo encima de _worker: _WorkItem.run si trabaja, queue.get si está libre
+            if not frames or frames[-1].f_code.co_name != "run":
+                return None
+            return [_label(f) for f in reversed(frames[:-1])]
+        frames.append(frame)
+        frame = frame.f_back
+    return None
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que perfila las peticiones marcadas o muestreadas (ver el docstring del módulo)."""
+
+    def __init__(self, app, enabled: bool = PROFILING_ENABLED, token: str = PROFILING_TOKEN,
+                 sample_rate: float = PROFILING_SAMPLE_RATE, interval_ms: float = PROFILING_INTERVAL_MS,
+                 max_seconds: float = PROFILING_MAX_SECONDS, output_dir: str = PROFILING_OUTPUT_DIR,
+                 max_files: int = PROFILING_MAX_FILES):
+        self.app = app
+        self.enabled = enabled
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.max_seconds = max_seconds
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        requested = headers.get(b"x-profile")
+        if requested is not None:
+            wanted = bool(self.token) and hmac.compare_digest(requested, self.token.encode())
+        else:
+            wanted = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not wanted or not self._busy.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        try:
+            inline = requested is not None and headers.get(b"x-profile-output") == b"inline"
+            await self._profile(scope, receive, send, inline)
+        finally:
+            self._busy.release()
+
+    async def _profile(self, scope, receive, send, inline: bool):
+        sampler = StackSampler(asyncio.current_task(), threading.get_ident(), self.interval, self.max_seconds)
+        filename = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{scope['method']}-{_slug(scope['path'])}{_PROFILE_SUFFIX}"
+        buffered = []
+
+        async def send_wrapper(message):
+            if inline:
+                buffered.append(message)
+                return
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), (b"x-profile-file", filename.encode())]}
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+
+        body = sampler.collapsed().encode()
+        if inline:
+            status = next((m["status"] for m in buffered if m["type"] == "http.response.start"), 500)
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profile-status", str(status).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+        else:
+            await asyncio.to_thread(self._write, filename, body)
+
+    def _write(self, filename: str, body: bytes):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, filename), "wb") as f:
+            f.write(body)
+        # Los nombres empiezan por la fecha: los primeros son los más antiguos
+        profiles = sorted(name for name in os.listdir(self.output_dir) if name.endswith(_PROFILE_SUFFIX))
+        for name in profiles[:max(len(profiles) - self.max_files, 0)]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except FileNotFoundError:
+                pass   # otro worker lo borró antes
+
+
+def _slug(path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
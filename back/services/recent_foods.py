@@ -0,0 +1,70 @@
+"""
+Lista de alimentos recientes de cada usuario.
+
+Un documento por usuario en "recent_foods" (_id = email) con como mucho
+RECENT_FOODS_MAX alimentos distintos, del más reciente al más antiguo. Se
+actualiza al registrar con un único update de pipeline (quita el nombre si ya
+estaba, lo pone delante y recorta), así que /food/recent es una lectura por
+_id y siempre devuelve hasta N alimentos distintos aunque el usuario repita
+siempre lo mismo. Si el usuario ya tenía ingestas de antes de esta lista,
+la primera lectura o el primer registro la construyen a partir de ellas.
+"""
+import os
+from typing import List
+
+RECENT_FOODS_MAX = int(os.getenv("RECENT_FOODS_MAX", "10"))
+
+
+def recent_item(food_id: int, name: str, calories) -> dict:
+    return {"id": food_id, "name": name, "detail": f"1 porción • {calories} Kcal"}
+
+
+async def push_recent_foods(db, user_email: str, items: List[dict]):
+    """Añade items (en el orden en que se registraron) al principio de la lista."""
+    newest_first = []
+    for item in reversed(items):
+        if all(item["name"] != seen["name"] for seen in newest_first):
+            newest_first.append(item)
+    names = [item["name"] for item in newest_first]
+
+    # $literal: un nombre que empiece por "$" no se lee como campo ni variable
+    update = [{"$set": {"items": {"$slice": [
+        {"$concatArrays": [
+            {"$literal": newest_first},
+            {"$filter": {
+                "input": {"$ifNull": ["$items", []]},
+                "as": "item",
+                "cond": {"$not": [{"$in": ["$$item.name", {"$literal": names}]}]}
+            }}
+        ]},
+        RECENT_FOODS_MAX
+    ]}}}]
+    result = await db.recent_foods.update_one({"_id": user_email}, update)
+    if not result.matched_count:
+        # Primer registro con esta lista: se parte de sus ingestas anteriores
+        await _backfill(db, user_email)
+        await db.recent_foods.update_one({"_id": user_email}, update, upsert=True)
+
+
+async def get_recent_foods(db, user_email: str) -> List[dict]:
+    document = await db.recent_foods.find_one({"_id": user_email})
+    if document is not None:
+        return document["items"]
+    return await _backfill(db, user_email)
+
+
+async def _backfill(db, user_email: str) -> List[dict]:
+    """
+    Usuarios con ingestas anteriores a esta lista: se construye una vez a
+    partir de sus últimas ingestas. Sin historial no se guarda nada.
+    """
+    items = []
+    cursor = db.ingestions.find({"user_email": user_email}).sort("date", -1).limit(RECENT_FOODS_MAX * 10)
+    async for ingestion in cursor:
+        if all(ingestion["food_name"] != item["name"] for item in items):
+            items.append(recent_item(ingestion.get("food_id", 0), ingestion["food_name"], ingestion["calories"]))
+            if len(items) == RECENT_FOODS_MAX:
+                break
+    if items:
+        await db.recent_foods.update_one({"_id": user_email}, {"$setOnInsert": {"items": items}}, upsert=True)
+    return items
@@ -0,0 +1,175 @@
+"""
+Tokens de acceso firmados y hash de contraseñas.
+
+- Los tokens son JWT HS256 (cabecera.payload.firma en base64url) firmados con
+  AUTH_SECRET_KEY y con caducidad ("exp"). get_current_user_email los verifica
+  en el propio proceso, sin consultar Mongo; los ya verificados se guardan en
+  una caché LRU hasta que caducan, así que la mayoría de peticiones solo
+  hacen una búsqueda en un dict. Sin clave se usa una temporal (solo para
+  desarrollo); una clave corta o la del ejemplo impide arrancar.
+- Las contraseñas se guardan con scrypt (sal aleatoria por usuario). scrypt es
+  lento a propósito; se ejecuta en un pool de hilos (hashlib libera el GIL)
+  para que una ráfaga de logins no bloquee el event loop.
+- Las contraseñas antiguas ("<password>-hashed") se siguen aceptando y se
+  re-guardan con scrypt en el siguiente login correcto.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "")
+AUTH_SECRET_MIN_LENGTH = 32
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(7 * 24 * 3600)))
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(os.cpu_count() or 2)))
+
+# Coste de scrypt: N=2^14, r=8 (16 MB de memoria, decenas de ms por hash)
+SCRYPT_N = int(os.getenv("AUTH_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+_LEGACY_SUFFIX = "-hashed"
+# Valor de ejemplo que traía .env.example: con él cualquiera puede firmar tokens
+_PLACEHOLDER_SECRETS = {"cambia-esta-clave-por-una-larga-y-aleatoria"}
+
+logger = logging.getLogger(__name__)
+
+if not AUTH_SECRET_KEY:
+    # Sin clave configurada cada arranque firma con una distinta: los tokens
+    # dejan de valer al reiniciar y no sirven entre workers.
+    logger.warning("AUTH_SECRET_KEY no está definida; se usa una clave temporal")
+    AUTH_SECRET_KEY = secrets.token_urlsafe(32)
+elif AUTH_SECRET_KEY in _PLACEHOLDER_SECRETS or len(AUTH_SECRET_KEY) < AUTH_SECRET_MIN_LENGTH:
+    raise RuntimeError(
+        f"AUTH_SECRET_KEY es el valor de ejemplo o tiene menos de {AUTH_SECRET_MIN_LENGTH} caracteres; "
+        "genera una con: python -c \"import secrets; print(secrets.token_urlsafe(48))\""
+    )
+
+_SECRET = AUTH_SECRET_KEY.encode()
+_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=").decode()
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(signing_input: str) -> str:
+    return _b64encode(hmac.new(_SECRET, signing_input.encode(), hashlib.sha256).digest())
+
+
+def create_access_token(email: str, ttl_seconds: int = AUTH_TOKEN_TTL_SECONDS) -> str:
+    payload = _b64encode(json.dumps({"sub": email, "exp": int(time.time()) + ttl_seconds}, separators=(",", ":")).encode())
+    signing_input = f"{_HEADER}.{payload}"
+    return f"{signing_input}.{_sign(signing_input)}"
+
+
+class TokenVerifier:
+    """Verifica tokens y recuerda los válidos hasta su caducidad."""
+
+    def __init__(self, max_entries: int = AUTH_TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._verified = OrderedDict()   # token -> (email, exp)
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> str:
+        entry = self._verified.get(token)
+        if entry is not None:
+            if entry[1] > time.time():
+                self._verified.move_to_end(token)
+                self.hits += 1
+                return entry[0]
+            del self._verified[token]
+
+        self.misses += 1
+        email, exp = self._decode(token)
+        self._verified[token] = (email, exp)
+        while len(self._verified) > self.max_entries:
+            self._verified.popitem(last=False)
+        return email
+
+    @staticmethod
+    def _decode(token: str):
+        try:
+            header, payload, signature = token.split(".")
+        except ValueError:
+            raise InvalidToken("Formato de token inválido")
+        # En bytes: compare_digest rechaza (TypeError) los str con caracteres no ASCII
+        if not hmac.compare_digest(signature.encode(), _sign(f"{header}.{payload}").encode()):
+            raise InvalidToken("Firma inválida")
+        try:
+            claims = json.loads(_b64decode(payload))
+            email, exp = claims["sub"], claims["exp"]
+        except (ValueError, KeyError, TypeError):
+            raise InvalidToken("Payload inválido")
+        if exp <= time.time():
+            raise InvalidToken("Token caducado")
+        return email, exp
+
+    def stats(self):
+        return {"entries": len(self._verified), "hits": self.hits, "misses": self.misses}
+
+
+# Instancia compartida por el worker
+token_verifier = TokenVerifier()
+
+
+def hash_password(password: str) -> str:
+    """Hash scrypt en formato 'scrypt$n$r$p$sal$hash' (bloqueante: ver hash_password_async)."""
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password: str, stored: str) -> bool:
+    if not stored.startswith("scrypt$"):
+        return hmac.compare_digest((password + _LEGACY_SUFFIX).encode(), stored.encode())
+    _, n, r, p, salt, digest = stored.split("$")
+    return hmac.compare_digest(_scrypt(password, _b64decode(salt), int(n), int(r), int(p)), _b64decode(digest))
+
+
+def needs_rehash(stored: str) -> bool:
+    return not stored.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+
+
+_hash_pool = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="password-hash")
+
+# Hash de referencia para que un email inexistente tarde lo mismo que una contraseña errónea
+_DUMMY_HASH = None
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, hash_password, password)
+
+
+async def verify_password_async(password: str, stored: str = None) -> bool:
+    global _DUMMY_HASH
+    if stored is None:
+        if _DUMMY_HASH is None:
+            _DUMMY_HASH = await hash_password_async(secrets.token_urlsafe(16))
+        await asyncio.get_running_loop().run_in_executor(_hash_pool, verify_password, password, _DUMMY_HASH)
+        return False
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, verify_password, password, stored)
@@ -0,0 +1,40 @@
+"""
+Backend de visión simulado, sin red ni API key.
+
+Devuelve siempre el mismo resultado para los mismos bytes (elige el plato a
+partir de un hash de la imagen), así los benchmarks son reproducibles y la
+caché de análisis se comporta igual que con Gemini. VISION_STUB_LATENCY_MS
+simula el tiempo de respuesta del modelo.
+"""
+import hashlib
+import os
+import time
+
+VISION_STUB_LATENCY_MS = float(os.getenv("VISION_STUB_LATENCY_MS", "800"))
+
+# Aproximadamente 1 de cada 10 imágenes "no es comida"
+_NOT_FOOD_RATIO = 10
+
+_DISHES = [
+    {"name": "Pechuga de Pollo (100g)", "calories": 165, "protein": 31, "fat": 4},
+    {"name": "Arroz Integral (1 taza)", "calories": 216, "protein": 5, "fat": 2},
+    {"name": "Ensalada César", "calories": 350, "protein": 12, "fat": 25},
+    {"name": "Plátano (1 mediano)", "calories": 105, "protein": 1, "fat": 0},
+    {"name": "Lomo Saltado", "calories": 650, "protein": 38, "fat": 30},
+    {"name": "Pizza de Pepperoni", "calories": 300, "protein": 13, "fat": 12},
+    {"name": "Salmón (100g)", "calories": 208, "protein": 20, "fat": 13},
+    {"name": "Avena cocida (1 taza)", "calories": 158, "protein": 6, "fat": 3},
+    {"name": "Ceviche de Pescado", "calories": 250, "protein": 30, "fat": 5},
+]
+
+
+def analyze_image_nutrition(image_bytes: bytes):
+    if VISION_STUB_LATENCY_MS > 0:
+        time.sleep(VISION_STUB_LATENCY_MS / 1000)
+
+    digest = int.from_bytes(hashlib.sha256(image_bytes).digest()[:8], "big")
+    if digest % _NOT_FOOD_RATIO == 0:
+        return {"is_food": False, "message": "La imagen no parece ser comida."}
+
+    dish = _DISHES[digest % len(_DISHES)]
+    return {"is_food": True, **dish}
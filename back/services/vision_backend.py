@@ -0,0 +1,42 @@
+"""
+Selección del backend de visión por configuración.
+
+VISION_BACKEND elige la implementación de analyze_image_nutrition:
+- "gemini" (por defecto): services/gemini_service.py, llama a la API de Gemini.
+- "stub": services/stub_vision_service.py, determinista y sin red, para
+  desarrollo y benchmarks.
+
+El módulo del backend se importa en la primera llamada, no al arrancar: la API
+levanta rápido aunque falte GEMINI_API_KEY o el SDK, y solo las peticiones de
+visión se enteran del problema. Cada llamada queda medida en /metrics.
+"""
+import importlib
+import os
+import threading
+from services.metrics import observe_inference
+
+VISION_BACKEND = os.getenv("VISION_BACKEND", "gemini").lower()
+
+_BACKENDS = {
+    "gemini": "services.gemini_service",
+    "stub": "services.stub_vision_service",
+}
+
+_analyze = None
+_lock = threading.Lock()
+
+
+def get_backend():
+    global _analyze
+    if _analyze is None:
+        with _lock:
+            if _analyze is None:
+                if VISION_BACKEND not in _BACKENDS:
+                    raise ValueError(f"VISION_BACKEND desconocido: {VISION_BACKEND!r} (opciones: {', '.join(_BACKENDS)})")
+                _analyze = importlib.import_module(_BACKENDS[VISION_BACKEND]).analyze_image_nutrition
+    return _analyze
+
+
+def analyze_image_nutrition(image_bytes: bytes):
+    """Analiza la imagen con el backend configurado. Bloqueante: se ejecuta en el pool de inferencia."""
+    return observe_inference(VISION_BACKEND, get_backend(), image_bytes)
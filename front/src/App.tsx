@@ -901,7 +901,8 @@ const App = () => {
   const [dashboardData, setDashboardData] = useState<any>(null);
 
   // UI State
-  const [notifications, setNotifications] = useState([]); // Mocked for now
+  const [notifications, setNotifications] = useState<any[]>([]);
+  const [unreadCount, setUnreadCount] = useState<number | null>(null);
   const [nextAppointment, setNextAppointment] = useState<any>(null); // Mocked for now
   const [toast, setToast] = useState({ show: false, message: '' });
 
@@ -920,26 +921,33 @@ const App = () => {
     }
   }, []);
 
+  // Notificaciones nuevas y contador de no leídas en tiempo real mientras hay sesión
+  useEffect(() => {
+    if (!user) {
+      return;
+    }
+    return api.subscribeToNotifications({
+      onNotification: ({ unread, ...notification }) => {
+        setNotifications((current) => [notification, ...current.filter((n: any) => n.id !== notification.id)]);
+        setUnreadCount(unread);
+      },
+      onUnread: setUnreadCount,
+    });
+  }, [user]);
+
   const fetchInitialData = async () => {
     setIsLoading(true);
     try {
-      const [profileData, planData, historyData, recentFoodsData, dashboardData, notificationsData, appointmentData] = await Promise.all([
-        api.getProfile(),
-        api.getPlan(),
-        api.getHistory(),
-        api.getRecentFoods(),
-        api.getDashboardData(),
-        api.getNotifications(),
-        api.getNextAppointment()
-      ]);
+      const home = await api.getHome();
+      const profileData = home.profile;
       setNutritionProfile(profileData);
-      setMealPlan(planData);
-      setHistory(historyData);
-      setRecentFoods(recentFoodsData);
+      setMealPlan(home.plan);
+      setHistory(home.history);
+      setRecentFoods(home.recent_foods);
       // The dashboard state will be set here
-      setDashboardData(dashboardData);
-      setNotifications(notificationsData);
-      setNextAppointment(appointmentData);
+      setDashboardData(home.dashboard);
+      setNotifications(home.notifications);
+      setNextAppointment(home.appointment ?? null);
 
       if (!profileData || profileData.goal === 'No definido') {
         setCurrentScreen('onboardingProfile');
@@ -1013,12 +1021,9 @@ const App = () => {
     await api.logFood(foodName, kcal);
     showToast(`Agregado: ${foodName}`);
     // Refresh recent foods AND dashboard data
-    const [recentFoodsData, dashboardData] = await Promise.all([
-      api.getRecentFoods(),
-      api.getDashboardData()
-    ]);
-    setRecentFoods(recentFoodsData);
-    setDashboardData(dashboardData);
+    const home = await api.getHome(['recent_foods', 'dashboard']);
+    setRecentFoods(home.recent_foods);
+    setDashboardData(home.dashboard);
   }
 
   const renderScreen = () => {
@@ -1047,7 +1052,7 @@ const App = () => {
         return <ConsultasScreen onBack={() => setCurrentScreen('home')} showToast={showToast} setNextAppointment={setNextAppointment} />;
 
       case 'home':
-        return <DashboardScreen user={user} dashboardData={dashboardData} unreadNotificationsCount={notifications.filter((n: any) => !n.isRead).length} onNavigate={setCurrentScreen} nextAppointment={nextAppointment} />;
+        return <DashboardScreen user={user} dashboardData={dashboardData} unreadNotificationsCount={unreadCount ?? notifications.filter((n: any) => !n.isRead).length} onNavigate={setCurrentScreen} nextAppointment={nextAppointment} />;
 
       case 'plan':
         return <PlanScreen nutritionProfile={nutritionProfile} mealPlan={mealPlan} />;
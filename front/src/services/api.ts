@@ -55,6 +55,13 @@ export const saveProfile = async (profileData: NutritionProfile): Promise<Nutrit
   return response.data;
 };
 
+// --- Home (todas las secciones de inicio en una sola petición) ---
+export const getHome = async (sections?: string[]) => {
+  const params = sections ? { sections: sections.join(',') } : undefined;
+  const response = await apiClient.get('/home/', { params });
+  return response.data;
+}
+
 // --- Dashboard ---
 export const getDashboardData = async () => {
   const response = await apiClient.get('/dashboard/');
@@ -94,6 +101,20 @@ export const logFood = async (foodName: string, calories?: number) => {
   return response.data;
 }
 
+// Registra varias comidas en una sola petición (p. ej. todo el plan del día)
+export const logFoodsBulk = async (
+  items: { food_name: string; calories?: number }[],
+  fromPlan = false,
+  mealTypes?: string[]
+) => {
+  const response = await apiClient.post('/food/log/bulk', {
+    items,
+    from_plan: fromPlan,
+    meal_types: mealTypes,
+  });
+  return response.data;
+}
+
 // --- Vision ---
 export const analyzeImage = async (file: File) => {
   const formData = new FormData();
@@ -110,6 +131,42 @@ export const getNotifications = async () => {
   return response.data;
 }
 
+export const getNotificationsPage = async (cursor?: number, unreadOnly = false) => {
+  const response = await apiClient.get('/notifications/page', { params: { cursor, unread_only: unreadOnly } });
+  return response.data;
+}
+
+export const getUnreadCount = async () => {
+  const response = await apiClient.get('/notifications/unread-count');
+  return response.data;
+}
+
+// Sin ids marca todas como leídas
+export const markNotificationsRead = async (ids?: number[]) => {
+  const response = await apiClient.post('/notifications/read', { ids });
+  return response.data;
+}
+
+// Notificaciones en tiempo real (SSE). EventSource no envía cabeceras: el token va en ?token=.
+// Devuelve la función que cierra la conexión; el navegador reconecta solo si se corta.
+export const subscribeToNotifications = (handlers: {
+  onNotification?: (notification: Notification & { unread: number }) => void,
+  onUnread?: (unread: number) => void,
+}) => {
+  const token = localStorage.getItem('authToken');
+  if (!token) {
+    return () => {};
+  }
+  const source = new EventSource(`${apiClient.defaults.baseURL}/notifications/stream?token=${encodeURIComponent(token)}`);
+  source.addEventListener('notification', (event) => {
+    handlers.onNotification?.(JSON.parse((event as MessageEvent).data));
+  });
+  source.addEventListener('unread', (event) => {
+    handlers.onUnread?.(JSON.parse((event as MessageEvent).data).unread);
+  });
+  return () => source.close();
+}
+
 // --- Appointments ---
 export const getNextAppointment = async () => {
   const response = await apiClient.get('/appointments/');